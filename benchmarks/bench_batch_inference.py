@@ -0,0 +1,45 @@
+"""
+Compare le débit (images/s) de MediaDetector image par image et par lots.
+
+Usage:
+    python benchmarks/bench_batch_inference.py --images 64 --batch-size 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ['PHASH_CACHE_PATH'] = ':memory:'  # mesures sans le cache pHash du bot
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.common import synthetic_images  # noqa: E402
+from utils.ai_detector import MediaDetector  # noqa: E402
+
+async def per_image(detector, items):
+    for file_data, filename in items:
+        await detector.analyze_media(file_data, filename)
+
+async def batched(detector, items, batch_size):
+    for i in range(0, len(items), batch_size):
+        await detector.analyze_batch(items[i:i + batch_size])
+
+def main(opt):
+    detector = MediaDetector()
+    asyncio.run(detector.analyze_batch(synthetic_images(2, seed=0)))  # warmup
+
+    # Images différentes à chaque passe : le cache pHash du détecteur ne doit jamais éviter l'inférence
+    passes = (('per-image', lambda items: per_image(detector, items)),
+              (f'batch={opt.batch_size}', lambda items: batched(detector, items, opt.batch_size)))
+    for seed, (name, run) in enumerate(passes, 1):
+        items = synthetic_images(opt.images, seed=seed)
+        start = time.perf_counter()
+        asyncio.run(run(items))
+        elapsed = time.perf_counter() - start
+        print(f"{name:>12}: {len(items) / elapsed:8.2f} images/s ({elapsed:.2f}s for {len(items)} images)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=16)
+    main(parser.parse_args())
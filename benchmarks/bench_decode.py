@@ -0,0 +1,77 @@
+"""
+Temps de décodage et pic mémoire d'une grande image : décodage complet vs décodage réduit (draft).
+
+Usage:
+    python benchmarks/bench_decode.py --width 8000 --height 6000
+"""
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.media_decode import decode_image  # noqa: E402
+
+def make_jpeg(path, width, height):
+    """JPEG photo-like (dégradés + bruit) de width x height pixels"""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    rng = np.random.default_rng(0)
+    rgb = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                    (x + y) / 2 + rng.normal(0, 8, (height, width))], axis=-1)
+    Image.fromarray(rgb.clip(0, 255).astype(np.uint8)).save(path, 'JPEG', quality=90)
+
+def peak_rss_kb():
+    """Pic de RSS du processus (VmHWM repart de zéro à l'exec, contrairement à ru_maxrss)"""
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_mode(mode, path, repeat):
+    """Exécuté dans un sous-processus pour isoler le pic mémoire"""
+    file_data = Path(path).read_bytes()
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if mode == 'full':
+            with Image.open(io.BytesIO(file_data)) as image:
+                array = np.asarray(image.convert('RGB'))
+        else:
+            array = decode_image(file_data, 640)
+    elapsed = (time.perf_counter() - start) / repeat
+    peak = peak_rss_kb() - baseline
+    print(json.dumps({'mode': mode, 'ms': elapsed * 1e3, 'peak_mb': peak / 1024, 'shape': list(array.shape)}))
+
+def main(opt):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'large.jpg'
+        make_jpeg(path, opt.width, opt.height)
+        print(f"{opt.width}x{opt.height} JPEG, {path.stat().st_size / 1e6:.1f}MB")
+        for mode in ('full', 'draft'):
+            out = subprocess.run([sys.executable, __file__, '--run', mode, '--path', str(path), '--repeat', str(opt.repeat)],
+                                 capture_output=True, text=True, check=True).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(f"{r['mode']:>6}: {r['ms']:8.1f} ms/image, peak +{r['peak_mb']:7.1f} MB, decoded shape {r['shape']}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=8000)
+    parser.add_argument('--height', type=int, default=6000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--run', choices=('full', 'draft'), help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    opt = parser.parse_args()
+    if opt.run:
+        run_mode(opt.run, opt.path, opt.repeat)
+    else:
+        main(opt)
@@ -0,0 +1,62 @@
+"""
+Débit du classement par nom de fichier : recherche mot-clé par mot-clé vs regex compilée (fichier par fichier / par lot).
+
+Usage:
+    python benchmarks/bench_filename_classifier.py --files 100000
+"""
+import argparse
+import os
+import random
+import string
+import sys
+from pathlib import Path
+
+os.environ.setdefault('LOGS_CHANNEL_ID', '0')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.common import timed  # noqa: E402
+from categories import CATEGORIES  # noqa: E402
+from utils.filename_classifier import FilenameClassifier  # noqa: E402
+
+EXTENSIONS = ['.png', '.jpg', '.gif', '.webp', '.mp4', '.webm', '.mov']
+
+def make_filenames(n: int, seed: int = 0):
+    """Noms réalistes : environ un sur trois contient un mot-clé de CATEGORIES"""
+    rng = random.Random(seed)
+    keywords = list(CATEGORIES)
+    names = []
+    for _ in range(n):
+        parts = [''.join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(4, 12)))]
+        if rng.random() < 0.33:
+            parts.insert(rng.randint(0, 1), rng.choice(keywords).capitalize())
+        parts.append(str(rng.randint(0, 99999)))
+        names.append('_'.join(parts) + rng.choice(EXTENSIONS))
+    return names
+
+def substring_scan(filenames):
+    """Référence : un test `in` par mot-clé et par fichier"""
+    results = []
+    for filename in filenames:
+        filename_lower = filename.lower()
+        results.append(next((path for keyword, path in CATEGORIES.items() if keyword in filename_lower), None))
+    return results
+
+def main(opt):
+    filenames = make_filenames(opt.files)
+    classifier = FilenameClassifier()
+
+    runs = {
+        'substring scan': lambda: substring_scan(filenames),
+        'regex per file': lambda: [classifier.classify(filename) for filename in filenames],
+        'regex batch': lambda: classifier.classify_batch(filenames),
+    }
+    print(f"{len(filenames)} filenames, {len(CATEGORIES)} keywords")
+    print(f"{'method':>16} {'time (ms)':>10} {'files/s':>12}")
+    for name, run in runs.items():
+        best = timed(run, opt.repeat)
+        print(f"{name:>16} {best * 1e3:>10.1f} {len(filenames) / best:>12.0f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,38 @@
+"""
+Prétraitement d'un lot : letterbox image par image + np.stack vs letterbox_batch dans un tampon préalloué.
+
+Usage:
+    python benchmarks/bench_letterbox.py --batch-sizes 1 8 32
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.common import timed  # noqa: E402
+from utils.dataloaders import letterbox, letterbox_batch  # noqa: E402
+
+def per_image(frames, size):
+    return torch.from_numpy(np.stack([letterbox(frame, size, auto=False)[0] for frame in frames])).permute(0, 3, 1, 2)
+
+def main(opt):
+    rng = np.random.default_rng(0)
+    shapes = [(720, 1280), (1080, 1920), (1280, 720), (480, 640)]
+    frames = [rng.integers(0, 255, shapes[i % len(shapes)] + (3,), dtype=np.uint8) for i in range(max(opt.batch_sizes))]
+    print(f"{'batch':>6} {'per image (ms)':>15} {'batched (ms)':>13} {'speedup':>8}")
+    for batch_size in opt.batch_sizes:
+        batch = frames[:batch_size]
+        assert torch.equal(per_image(batch, opt.img_size), letterbox_batch(batch, opt.img_size)[0])
+        t_ref = timed(lambda: per_image(batch, opt.img_size), opt.repeat, warmup=1)
+        t_new = timed(lambda: letterbox_batch(batch, opt.img_size), opt.repeat, warmup=1)
+        print(f"{batch_size:>6} {t_ref * 1e3:>15.2f} {t_new * 1e3:>13.2f} {t_ref / t_new:>7.2f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--img-size', type=int, default=640)
+    parser.add_argument('--repeat', type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,65 @@
+"""
+Latence par modèle avant et après la préparation du chargement (Conv+BN fusionnées, eval, poids figés,
+channels_last), pour les modèles eager et les artefacts TorchScript s'ils existent.
+
+Usage:
+    python benchmarks/bench_model_prep.py --batch-size 8 --iterations 5
+"""
+import argparse
+import copy
+import os
+import sys
+from pathlib import Path
+
+import torch
+
+os.environ.setdefault('LOGS_CHANNEL_ID', '0')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.common import timed  # noqa: E402
+from utils.ai_detector import RESNET_IMG_SIZE, YOLO_IMG_SIZE, prepare_for_inference  # noqa: E402
+from utils.model_export import COMPILED_MODELS_DIR, RESNET_ARTIFACT, YOLO_ARTIFACT, load_artifact  # noqa: E402
+from utils.model_loader import load_resnet_model, load_yolo_model  # noqa: E402
+
+def timed_model(model, x, iterations: int) -> float:
+    """Meilleure latence (s) d'un passage, après deux passages de préchauffage"""
+    with torch.inference_mode():
+        return timed(lambda: model(x), iterations, warmup=2)
+
+def first_output(y) -> torch.Tensor:
+    return y[0] if isinstance(y, (list, tuple)) else y
+
+def compare(name, model, fuse, x, iterations):
+    before = copy.deepcopy(model)
+    # Tel que chargé avant ce changement : mode eval seulement pour ResNet eager
+    if fuse and not isinstance(before, torch.jit.ScriptModule):
+        before.eval()
+    after = prepare_for_inference(copy.deepcopy(model), fuse=fuse)
+    with torch.inference_mode():
+        diff = (first_output(before(x)) - first_output(after(x))).abs().max().item()
+    t_before, t_after = timed_model(before, x, iterations), timed_model(after, x, iterations)
+    print(f"{name:>18} {t_before * 1e3:>12.1f} {t_after * 1e3:>12.1f} {t_before / t_after:>8.2f}x {diff:>10.2e}")
+
+def main(opt):
+    resnet_x = torch.rand(opt.batch_size, 3, RESNET_IMG_SIZE, RESNET_IMG_SIZE).contiguous(memory_format=torch.channels_last)
+    yolo_x = torch.rand(opt.batch_size, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE).contiguous(memory_format=torch.channels_last)
+
+    print(f"batch {opt.batch_size}")
+    print(f"{'model':>18} {'before (ms)':>12} {'after (ms)':>12} {'speedup':>9} {'max diff':>10}")
+    resnet, yolo = load_resnet_model(), load_yolo_model()
+    if resnet is not None:
+        compare('resnet18 eager', resnet, True, resnet_x, opt.iterations)
+    if yolo is not None:
+        compare('yolov5s eager', yolo, False, yolo_x, opt.iterations)
+
+    compiled_dir = Path(COMPILED_MODELS_DIR)
+    for name, artifact, x in (('resnet18 torchscript', RESNET_ARTIFACT, resnet_x),
+                              ('yolov5s torchscript', YOLO_ARTIFACT, yolo_x)):
+        loaded = load_artifact(compiled_dir / artifact)
+        if loaded is not None:
+            compare(name, loaded[0], True, x, opt.iterations)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,77 @@
+"""
+NMS et remise à l'échelle des boîtes : utils.general (lot vectorisé) vs implémentations YOLOv5 vendues (image par image).
+
+Usage:
+    python benchmarks/bench_nms.py --batch-sizes 1 8 32 --objects 20
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import utils.general as general  # noqa: E402
+from benchmarks.common import timed  # noqa: E402
+from utils.model_loader import YOLO_REPO_DIR, vendored_repo  # noqa: E402
+
+with vendored_repo():
+    sys.path.insert(0, str(ROOT / YOLO_REPO_DIR))
+    import utils.general as vendored  # noqa: E402
+
+def synthetic_predictions(batch_size: int, objects: int, anchors: int = 25200, nc: int = 80, seed: int = 0):
+    """Sorties brutes réalistes : objectness quasi nulle sauf autour de quelques objets, chacun vu par plusieurs ancres"""
+    g = torch.Generator().manual_seed(seed)
+    pred = torch.rand(batch_size, anchors, 5 + nc, generator=g)
+    pred[..., 4] *= 0.05
+    for b in range(batch_size):
+        centers = torch.rand(objects, 2, generator=g) * 600 + 20
+        sizes = torch.rand(objects, 2, generator=g) * 150 + 20
+        classes = torch.randint(0, nc, (objects,), generator=g)
+        for o in range(objects):
+            idx = torch.randint(0, anchors, (12,), generator=g)  # ancres voisines qui détectent le même objet
+            pred[b, idx, :2] = centers[o] + torch.randn(12, 2, generator=g) * 4
+            pred[b, idx, 2:4] = sizes[o] * (1 + torch.randn(12, 2, generator=g) * 0.05)
+            pred[b, idx, 4] = 0.6 + torch.rand(12, generator=g) * 0.4
+            pred[b, idx, 5 + classes[o]] = 0.9
+    return pred
+
+def same_detections(a, b) -> bool:
+    """Mêmes détections par image (l'ordre entre scores égaux peut différer)"""
+    return all(x.shape == y.shape and torch.allclose(torch.tensor(sorted(x.tolist())), torch.tensor(sorted(y.tolist())))
+               for x, y in zip(a, b))
+
+def main(opt):
+    print(f"{'batch':>6} {'vendored NMS (ms)':>18} {'batched NMS (ms)':>17} {'same':>5} "
+          f"{'vendored scale (ms)':>20} {'batched scale (ms)':>19} {'same':>5}")
+    for batch_size in opt.batch_sizes:
+        pred = synthetic_predictions(batch_size, opt.objects)
+        ref, out = vendored.non_max_suppression(pred), general.non_max_suppression(pred)
+        t_ref = timed(lambda: vendored.non_max_suppression(pred), opt.repeat)
+        t_out = timed(lambda: general.non_max_suppression(pred), opt.repeat)
+
+        # Retour aux résolutions d'origine (une par image)
+        shapes = [(720, 1280) if i % 2 else (1080, 1920) for i in range(batch_size)]
+        dets = [d.clone() for d in out]
+        padded = torch.nn.utils.rnn.pad_sequence(dets, batch_first=True)
+
+        def per_image():
+            for d, shape in zip(dets, shapes):
+                vendored.scale_boxes((640, 640), d.clone(), shape)
+
+        t_scale_ref = timed(per_image, opt.repeat)
+        t_scale_out = timed(lambda: general.scale_boxes((640, 640), padded.clone(), shapes), opt.repeat)
+        scaled = general.scale_boxes((640, 640), padded.clone(), shapes)
+        scale_ok = all(torch.allclose(scaled[i, :len(d)], vendored.scale_boxes((640, 640), d.clone(), shape))
+                       for i, (d, shape) in enumerate(zip(dets, shapes)))
+
+        print(f"{batch_size:>6} {t_ref * 1e3:>18.2f} {t_out * 1e3:>17.2f} {str(same_detections(ref, out)):>5} "
+              f"{t_scale_ref * 1e3:>20.3f} {t_scale_out * 1e3:>19.3f} {str(scale_ok):>5}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--objects', type=int, default=20, help='objets par image')
+    parser.add_argument('--repeat', type=int, default=5)
+    main(parser.parse_args())
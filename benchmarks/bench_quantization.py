@@ -0,0 +1,60 @@
+"""
+Vitesse et concordance du ResNet18 int8 statique (calibré) face au fp32.
+
+Usage:
+    python benchmarks/bench_quantization.py --calibration cache/calibration --images path/to/eval_images
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+os.environ.setdefault('LOGS_CHANNEL_ID', '0')
+os.environ['INFERENCE_WORKERS'] = '0'  # modèles chargés dans ce processus
+os.environ['PHASH_CACHE_PATH'] = ':memory:'  # mesures sans le cache pHash du bot
+os.environ['DETECTOR_QUANTIZE'] = ''  # référence fp32
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.ai_detector import MediaDetector  # noqa: E402
+from utils.quantization import quantize_static  # noqa: E402
+
+def main(opt):
+    detector = MediaDetector()
+    if detector.resnet_model is None:
+        sys.exit("ResNet18 could not be loaded")
+
+    calibration = detector.calibration_batches(opt.calibration, opt.limit)
+    evaluation = detector.calibration_batches(opt.images, opt.limit)
+    if not calibration or not evaluation:
+        sys.exit("No images found in the calibration/evaluation directories")
+    n_images = sum(len(batch) for batch in evaluation)
+
+    fp32 = detector.resnet_model
+    models = {'fp32': fp32, 'static': quantize_static(fp32, calibration)}
+
+    outputs, timings = {}, {}
+    for name, model in models.items():
+        with torch.inference_mode():
+            model(evaluation[0])  # warmup
+            start = time.perf_counter()
+            outputs[name] = torch.cat([model(batch).softmax(1) for batch in evaluation])
+            timings[name] = time.perf_counter() - start
+
+    print(f"{n_images} images, engine={torch.backends.quantized.engine}")
+    print(f"{'mode':>8} {'ms/image':>9} {'speedup':>8} {'top-1 agree':>12} {'folder agree':>13}")
+    reference = outputs['fp32']
+    reference_folders = (reference @ detector.category_matrix).argmax(1)
+    for name, probs in outputs.items():
+        top1 = (probs.argmax(1) == reference.argmax(1)).float().mean().item()
+        folders = ((probs @ detector.category_matrix).argmax(1) == reference_folders).float().mean().item()
+        print(f"{name:>8} {timings[name] / n_images * 1e3:>9.2f} {timings['fp32'] / timings[name]:>7.2f}x "
+              f"{top1:>11.1%} {folders:>12.1%}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calibration', default='cache/calibration', help='images de calibration')
+    parser.add_argument('--images', default='model_cache/ultralytics_yolov5_master/data/images', help='images d\'évaluation')
+    parser.add_argument('--limit', type=int, default=256)
+    main(parser.parse_args())
@@ -0,0 +1,42 @@
+"""
+Latence et débit du chemin ResNet18 de MediaDetector selon la taille de lot.
+
+Usage:
+    python benchmarks/bench_resnet.py --batch-sizes 1 8 32 --iterations 10
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+os.environ.setdefault('LOGS_CHANNEL_ID', '0')
+os.environ['INFERENCE_WORKERS'] = '0'  # modèles chargés dans ce processus
+os.environ['PHASH_CACHE_PATH'] = ':memory:'  # mesures sans le cache pHash du bot
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.ai_detector import MediaDetector  # noqa: E402
+
+def main(opt):
+    detector = MediaDetector()
+    if detector.resnet_model is None:
+        sys.exit("ResNet18 could not be loaded")
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(max(opt.batch_sizes))]
+    print(f"{'batch':>6} {'latency (ms)':>14} {'images/s':>10}")
+    for batch_size in opt.batch_sizes:
+        batch = detector.preprocess(frames[:batch_size])
+        detector.analyze_with_resnet(batch)  # warmup
+        start = time.perf_counter()
+        for _ in range(opt.iterations):
+            detector.analyze_with_resnet(batch)
+        elapsed = (time.perf_counter() - start) / opt.iterations
+        print(f"{batch_size:>6} {elapsed * 1e3:>14.1f} {batch_size / elapsed:>10.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--iterations', type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,105 @@
+"""
+Balayage des réglages d'inférence CPU (workers, threads intra/inter-op, affinité) : débit de MediaDetector
+et retard de la boucle asyncio pendant la classification.
+
+Chaque réglage tourne dans un processus neuf (les threads inter-op ne se fixent qu'une fois par processus).
+
+Usage:
+    python benchmarks/bench_runtime_profile.py --workers 0 1 2 --threads 1 2 4 --affinity
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+os.environ['PHASH_CACHE_PATH'] = ':memory:'  # mesures sans le cache pHash du bot
+
+ROOT = Path(__file__).resolve().parents[1]
+LAG_INTERVAL = 0.01  # Période du battement qui mesure le retard de la boucle (s)
+sys.path.insert(0, str(ROOT))
+from benchmarks.common import synthetic_images  # noqa: E402
+
+async def measure_lag(lags: list, stop: asyncio.Event):
+    """Retard de chaque réveil par rapport à l'échéance prévue"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected))
+
+async def run_one(opt) -> dict:
+    """Un réglage (lu dans l'environnement par MediaDetector au chargement)"""
+    from utils.ai_detector import MediaDetector
+
+    detector = MediaDetector()
+    # Premier lot et lots mesurés distincts : pas de hit du cache pHash dans la mesure
+    first, items = synthetic_images(opt.batch_size, seed=1), synthetic_images(opt.images, seed=2)
+
+    lags, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(measure_lag(lags, stop))
+    # Premier lot mesuré à part : démarrage des workers et chargement des modèles, qui ne doivent pas bloquer la boucle
+    await detector.batcher.submit_many(first)
+    startup_lags = len(lags)
+
+    start = time.perf_counter()
+    # Les lots de MediaDetector passent par le batcher, comme pour des jobs concurrents
+    await detector.batcher.submit_many(items)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    if detector.pool is not None:
+        detector.pool.shutdown()
+
+    startup_ms = np.array(lags[:startup_lags] or [0.0]) * 1e3
+    lags_ms = np.array(lags[startup_lags:] or [0.0]) * 1e3
+    return {
+        'images_per_s': len(items) / elapsed,
+        'startup_lag_max_ms': float(startup_ms.max()),
+        'lag_p50_ms': float(np.percentile(lags_ms, 50)),
+        'lag_p99_ms': float(np.percentile(lags_ms, 99)),
+        'lag_max_ms': float(lags_ms.max()),
+        'runtime': detector.get_metrics()['runtime'],
+    }
+
+def sweep(opt):
+    settings = list(itertools.product(opt.workers, opt.threads, opt.interop_threads,
+                                      [False, True] if opt.affinity else [False]))
+    print(f"{'workers':>7} {'intra':>5} {'inter':>5} {'affinity':>8} {'images/s':>9} "
+          f"{'startup lag max (ms)':>20} {'lag p50 (ms)':>13} {'lag p99 (ms)':>13} {'lag max (ms)':>13}")
+    for workers, threads, interop, affinity in settings:
+        env = dict(os.environ, LOGS_CHANNEL_ID=os.environ.get('LOGS_CHANNEL_ID', '0'),
+                   INFERENCE_WORKERS=str(workers), DETECTOR_THREADS=str(threads),
+                   DETECTOR_INTEROP_THREADS=str(interop), DETECTOR_CPU_AFFINITY='1' if affinity else '0')
+        child = subprocess.run(
+            [sys.executable, __file__, '--run-one', '--images', str(opt.images), '--batch-size', str(opt.batch_size)],
+            env=env, cwd=ROOT, capture_output=True, text=True
+        )
+        lines = [line for line in child.stdout.splitlines() if line.startswith('{')]
+        if child.returncode != 0 or not lines:
+            print(f"{workers:>7} {threads:>5} {interop:>5} {str(affinity):>8}  failed: {child.stderr.strip()[-200:]}")
+            continue
+        result = json.loads(lines[-1])
+        print(f"{workers:>7} {threads:>5} {interop:>5} {str(affinity):>8} {result['images_per_s']:>9.1f} "
+              f"{result['startup_lag_max_ms']:>20.2f} {result['lag_p50_ms']:>13.2f} {result['lag_p99_ms']:>13.2f} {result['lag_max_ms']:>13.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2], help='INFERENCE_WORKERS')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, os.cpu_count() or 1], help='threads intra-op')
+    parser.add_argument('--interop-threads', type=int, nargs='+', default=[1])
+    parser.add_argument('--affinity', action='store_true', help='mesurer aussi avec DETECTOR_CPU_AFFINITY')
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--run-one', action='store_true', help=argparse.SUPPRESS)
+    opt = parser.parse_args()
+    if opt.run_one:
+        print(json.dumps(asyncio.run(run_one(opt))))
+    else:
+        sweep(opt)
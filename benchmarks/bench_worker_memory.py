@@ -0,0 +1,55 @@
+"""
+Mémoire par worker d'inférence : workers forkés après chargement (forkserver) vs chargement par worker (spawn).
+
+RSS compte les pages partagées dans chaque worker, PSS les répartit entre les processus qui les partagent
+et USS ne compte que les pages propres au worker (ce qu'ajoute un worker de plus).
+
+Usage:
+    python benchmarks/bench_worker_memory.py --workers 1 2 4
+"""
+import argparse
+import asyncio
+import multiprocessing.forkserver
+import os
+import sys
+from pathlib import Path
+
+import psutil
+
+os.environ.setdefault('LOGS_CHANNEL_ID', '0')
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from benchmarks.common import synthetic_images  # noqa: E402
+from utils.inference_pool import InferencePool  # noqa: E402
+
+def memory_mb(pid: int) -> dict:
+    info = psutil.Process(pid).memory_full_info()
+    return {key: getattr(info, key) / 2**20 for key in ('rss', 'pss', 'uss')}
+
+async def measure(start_method: str, workers: int, items):
+    """Mémoire de chaque worker après qu'ils ont tous traité au moins un lot, et celle du forkserver"""
+    pool = InferencePool(workers, start_method)
+    try:
+        # Assez de lots simultanés pour démarrer tous les workers
+        await asyncio.gather(*(pool.classify_batch(items) for _ in range(workers * 2)))
+        server_pid = multiprocessing.forkserver._forkserver._forkserver_pid if start_method == 'forkserver' else None
+        return [memory_mb(pid) for pid in pool.worker_pids()], memory_mb(server_pid)['pss'] if server_pid else 0.0
+    finally:
+        pool.shutdown()
+
+def main(opt):
+    items = synthetic_images(opt.images, fmt='PNG')
+    print(f"{'start':>10} {'workers':>8} {'RSS/worker':>11} {'PSS/worker':>11} {'USS/worker':>11} "
+          f"{'forkserver PSS':>15} {'total PSS':>10}  (MB)")
+    for workers in opt.workers:
+        for start_method in opt.start_methods:
+            memory, server_pss = asyncio.run(measure(start_method, workers, items))
+            mean = {key: sum(m[key] for m in memory) / len(memory) for key in ('rss', 'pss', 'uss')}
+            print(f"{start_method:>10} {len(memory):>8} {mean['rss']:>11.0f} {mean['pss']:>11.0f} {mean['uss']:>11.0f} "
+                  f"{server_pss:>15.0f} {sum(m['pss'] for m in memory) + server_pss:>10.0f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--start-methods', nargs='+', default=['spawn', 'forkserver'])
+    parser.add_argument('--images', type=int, default=4, help='images par lot')
+    main(parser.parse_args())
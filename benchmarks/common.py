@@ -0,0 +1,30 @@
+"""
+Outils communs aux benchmarks : images synthétiques et chronométrage
+"""
+import io
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+def synthetic_images(n: int, size=(1280, 720), fmt: str = 'JPEG', seed: int = 0) -> List[Tuple[bytes, str]]:
+    """Images aléatoires de taille fixe ; une graine différente par passe évite les hits du cache pHash"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for i in range(n):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)).save(buffer, fmt)
+        images.append((buffer.getvalue(), f"image_{seed}_{i}.{fmt.lower()}"))
+    return images
+
+def timed(fn: Callable, repeat: int = 1, warmup: int = 0) -> float:
+    """Meilleur temps (s) d'un appel de `fn` sur `repeat` essais, après `warmup` appels non mesurés"""
+    for _ in range(warmup):
+        fn()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,70 @@
+"""
+Faux hébergeur d'upload local pour éprouver UploadRouter (latence et erreurs injectées).
+
+Usage:
+    python benchmarks/fake_upload_host.py --latency 5 --error-rate 0.5 --uploads 20
+"""
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.upload_hosts import CatboxBackend, LitterboxBackend, UploadRouter, UploadUnavailable  # noqa: E402
+
+def make_app(name: str, latency: float, error_rate: float) -> web.Application:
+    """Répond comme Catbox, après `latency` secondes, en échouant avec la probabilité `error_rate`"""
+    async def upload(request):
+        await request.read()
+        await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            return web.Response(status=503, text="Service Unavailable")
+        return web.Response(text=f"https://{name}.invalid/{random.randrange(1 << 32):08x}.zip")
+
+    app = web.Application(client_max_size=1024 ** 3)
+    app.router.add_post('/', upload)
+    return app
+
+async def start_host(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+async def main(opt):
+    runners = [
+        await start_host(make_app('flaky', opt.latency, opt.error_rate), opt.port),
+        await start_host(make_app('healthy', 0.05, 0.0), opt.port + 1),
+    ]
+    router = UploadRouter(
+        [CatboxBackend(f"http://127.0.0.1:{opt.port}/"), LitterboxBackend(f"http://127.0.0.1:{opt.port + 1}/")],
+        connect_timeout=1,
+        read_timeout=opt.read_timeout
+    )
+    payload = b"\0" * opt.size
+    try:
+        for i in range(opt.uploads):
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            try:
+                url = await router.upload(payload, f"upload_{i}.zip")
+            except UploadUnavailable as e:
+                url = f"FAILED ({e})"
+            print(f"{i:3d} {loop.time() - started:6.2f}s {url}")
+            print(f"    {router.status()}")
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=3.0, help='latence injectée sur l\'hébergeur principal (s)')
+    parser.add_argument('--error-rate', type=float, default=0.5, help='probabilité d\'erreur 503 sur l\'hébergeur principal')
+    parser.add_argument('--read-timeout', type=float, default=2.0)
+    parser.add_argument('--uploads', type=int, default=10)
+    parser.add_argument('--size', type=int, default=1024 * 1024, help='taille du fichier envoyé (octets)')
+    asyncio.run(main(parser.parse_args()))
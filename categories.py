@@ -0,0 +1,52 @@
+"""
+Catégories de classement et correspondances des classes des modèles (sans dépendance au .env du bot)
+"""
+
+# Configuration des catégories
+CATEGORIES = {
+    # Jeux
+    'valorant': 'Games/Valorant',
+    'minecraft': 'Games/Minecraft',
+    'fortnite': 'Games/Fortnite',
+    'csgo': 'Games/CS',
+    'cs2': 'Games/CS',
+    'lol': 'Games/LeagueOfLegends',
+    'league': 'Games/LeagueOfLegends',
+    'apex': 'Games/ApexLegends',
+    'rocket': 'Games/RocketLeague',
+    
+    # Apps
+    'discord': 'Apps/Discord',
+    'photoshop': 'Apps/Photoshop',
+    'premiere': 'Apps/Premiere',
+    
+    # Autres
+    'meme': 'Fun/Memes',
+    'funny': 'Fun/Memes',
+    'clip': 'Clips',
+    'gameplay': 'Gameplay',
+    'screenshot': 'Screenshots',
+}
+
+# Classes ImageNet reconnues par ResNet -> clés de CATEGORIES
+IMAGENET_CATEGORIES = {
+    917: 'meme',      # comic book
+    921: 'meme',      # dust jacket
+    916: 'discord',   # website (captures d'interface)
+    918: 'discord',   # crossword (listes de messages)
+    613: 'gameplay',  # joystick
+    527: 'gameplay',  # desktop computer
+    620: 'gameplay',  # laptop
+    664: 'gameplay',  # monitor
+    781: 'gameplay',  # scoreboard
+    782: 'gameplay',  # CRT screen
+    851: 'gameplay',  # television
+}
+
+# Classes COCO détectées par YOLOv5 -> clés de CATEGORIES
+COCO_CATEGORIES = {
+    62: 'gameplay',  # tv
+    63: 'gameplay',  # laptop
+    64: 'gameplay',  # mouse
+    66: 'gameplay',  # keyboard
+}
@@ -8,6 +8,7 @@ import tempfile
 import zipfile
 import aiohttp
 from utils.catbox import CatboxUploader
+from utils.upload_cache import get_upload_cache
 import psutil
 import os.path
 
@@ -61,6 +62,7 @@ class Download(commands.Cog):
             os.makedirs(temp_dir, exist_ok=True)
 
             downloaded_files = []
+            failed_downloads = 0
             total_size = 0
             
             message_limit = None if messages <= 0 else messages
@@ -76,6 +78,25 @@ class Download(commands.Cog):
                 
                 total_messages = len(channel_messages)
                 logger.debug(f"Successfully fetched {total_messages} messages")
+
+                # Même sélection déjà archivée récemment : renvoyer le lien sans tout refaire
+                upload_cache = get_upload_cache()
+                cache_key = upload_cache.make_key(
+                    (attachment.id
+                     for message in channel_messages
+                     for attachment in message.attachments
+                     if os.path.splitext(attachment.filename)[1].lower() in self.media_types[type]),
+                    type
+                )
+                cached = upload_cache.get(cache_key)
+                if cached:
+                    logger.debug(f"Upload cache hit for {cache_key}")
+                    await interaction.followup.send(
+                        f"📦 This media was archived recently.\n"
+                        f"Download it here: {cached['url']}"
+                    )
+                    return
+
                 await interaction.followup.send(f"📥 Found {total_messages} messages, starting media download...")
 
                 # Process messages in batches
@@ -100,8 +121,12 @@ class Download(commands.Cog):
                                                     f"⏳ Downloaded {len(downloaded_files)} files "
                                                     f"({total_size / (1024*1024):.1f}MB)"
                                                 )
+                                        else:
+                                            logger.error(f"Error downloading {attachment.filename}: HTTP {response.status}")
+                                            failed_downloads += 1
                             except Exception as e:
                                 logger.error(f"Error downloading {attachment.filename}: {e}")
+                                failed_downloads += 1
                                 continue
 
                     processed += 1
@@ -151,8 +176,10 @@ class Download(commands.Cog):
                     try:
                         uploader = CatboxUploader()
                         with open(zip_path, 'rb') as f:
-                            file_data = f.read()
-                        url = await uploader.upload_file(filename=zip_name, file_data=file_data)
+                            url = await uploader.upload_file(filename=zip_name, file_data=f)
+                        # Archive incomplète : ne pas la resservir pour toute la sélection
+                        if not failed_downloads:
+                            upload_cache.set(cache_key, url)
                         await interaction.followup.send(
                             f"📦 Large file ({file_size / (1024*1024):.2f}MB).\n"
                             f"Download it here: {url}"
@@ -24,28 +24,3 @@ MEDIA_TYPES = {
 
 # Limites
 MAX_DIRECT_DOWNLOAD_SIZE = 25 * 1024 * 1024  # 25MB
-
-# Configuration des catégories
-CATEGORIES = {
-    # Jeux
-    'valorant': 'Games/Valorant',
-    'minecraft': 'Games/Minecraft',
-    'fortnite': 'Games/Fortnite',
-    'csgo': 'Games/CS',
-    'cs2': 'Games/CS',
-    'lol': 'Games/LeagueOfLegends',
-    'league': 'Games/LeagueOfLegends',
-    'apex': 'Games/ApexLegends',
-    'rocket': 'Games/RocketLeague',
-    
-    # Apps
-    'discord': 'Apps/Discord',
-    'photoshop': 'Apps/Photoshop',
-    'premiere': 'Apps/Premiere',
-    
-    # Autres
-    'meme': 'Fun/Memes',
-    'funny': 'Fun/Memes',
-    'clip': 'Clips',
-    'gameplay': 'Gameplay',
-} 
\ No newline at end of file
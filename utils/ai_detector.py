@@ -1,15 +1,107 @@
+import asyncio
+import gc
+import threading
+import psutil
 import torch
-from PIL import Image
-import cv2
+import torch.nn.functional as F
 import numpy as np
 from pathlib import Path
-import io
+import hashlib
+import json
 import os
 import time
+from typing import List, Tuple
+from categories import CATEGORIES, COCO_CATEGORIES, IMAGENET_CATEGORIES
+from .dataloaders import letterbox_batch
+from .general import non_max_suppression
+from .autobatch import AUTOBATCH_SIZES, host_fingerprint, load_batch_size, profile_batch_sizes, save_batch_size, select_batch_size
+from .batcher import MicroBatcher
+from .inference_pool import InferencePool
+from .media_decode import decode_image, decode_image_frames, decode_video_frames
+from .phash_cache import PhashCache
+from .filename_classifier import get_filename_classifier, split_category_path
+from .quantization import quantize_static
+from .runtime_profile import apply_runtime_profile, runtime_profile
+from .torch_utils import fuse_conv_bn_fx
+from .model_loader import load_resnet_model, load_yolo_model, missing_weights
+from .model_export import COMPILED_MODELS_DIR, RESNET_ARTIFACT, YOLO_ARTIFACT, load_artifact
+
+# Entrées des modèles
+YOLO_IMG_SIZE = 640
+RESNET_IMG_SIZE = 224
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# Quantification int8 du ResNet sur CPU : '' ou 'static' (calibrée sur les images de QUANTIZE_CALIBRATION_DIR)
+DETECTOR_QUANTIZE = os.getenv('DETECTOR_QUANTIZE', '')
+QUANTIZE_CALIBRATION_DIR = "cache/calibration"
+QUANTIZE_CALIBRATION_IMAGES = 64
+
+def calibration_files(directory: str = QUANTIZE_CALIBRATION_DIR, limit: int = QUANTIZE_CALIBRATION_IMAGES) -> List[Path]:
+    return [path for path in sorted(Path(directory).glob('*')) if path.is_file()][:limit]
+
+# Quantification réellement appliquée au chargement : sans images de calibration, le ResNet reste en fp32
+QUANTIZE_MODE = 'static' if DETECTOR_QUANTIZE == 'static' and calibration_files() else ''
+
+# Passages à vide au chargement (le profiling executor de TorchScript optimise après 2 appels)
+WARMUP_ITERATIONS = 2
+
+# Vidéos : nombre d'images clés analysées par fichier, quelle que soit la durée
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mov', '.avi', '.mkv')
+VIDEO_MAX_FRAMES = 4
+
+# Images animées (GIF, WebP) : nombre d'images réparties sur l'animation analysées par fichier
+ANIMATION_MAX_FRAMES = 4
+
+# Processus dédiés à l'inférence (0 = threads du processus principal)
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', 1))
+
+# Cascade nom de fichier -> ResNet -> YOLO : chaque niveau n'est exécuté que si le précédent n'est pas assez sûr
+CASCADE_FILENAME_THRESHOLD = 0.8  # Mot-clé de jeu/application : pas d'inférence
+CASCADE_RESNET_THRESHOLD = 0.6  # En dessous, les images du fichier passent aussi dans YOLO
+
+# Version des classements : change avec les modèles, la quantification, les tables de catégories et les seuils,
+# ce qui rend obsolètes les classements enregistrés auparavant
+MODEL_VERSION = hashlib.sha256(json.dumps([
+    'yolov5s', 'resnet18', QUANTIZE_MODE, VIDEO_MAX_FRAMES, ANIMATION_MAX_FRAMES, CASCADE_FILENAME_THRESHOLD, CASCADE_RESNET_THRESHOLD,
+    CATEGORIES, sorted(IMAGENET_CATEGORIES.items()), sorted(COCO_CATEGORIES.items()),
+]).encode()).hexdigest()[:16]
+
+# Libération des modèles après une période sans inférence (s, 0 = jamais), rechargés au lot suivant
+MODEL_IDLE_TIMEOUT = float(os.getenv('MODEL_IDLE_TIMEOUT', 600))
+
+# Micro-batching entre les jobs concurrents
+MICRO_BATCH_MAX_SIZE = 16  # Taille max d'un lot envoyé aux modèles
+MICRO_BATCH_MAX_WAIT = 0.05  # Attente max (s) d'une requête avant envoi du lot
+
+# Taille max des lots calibrée sur la machine avant le premier lot (à la place de MICRO_BATCH_MAX_SIZE)
+DETECTOR_AUTOBATCH = os.getenv('DETECTOR_AUTOBATCH', '1').lower() in ('1', 'true', 'yes')
+DETECTOR_BATCH_LATENCY_BUDGET = float(os.getenv('DETECTOR_BATCH_LATENCY_BUDGET', 2.0))  # Durée max (s) d'un lot
+
+def prepare_for_inference(model: torch.nn.Module, fuse: bool) -> torch.nn.Module:
+    """Module prêt pour l'inférence seule (les modules TorchScript sont figés par torch.jit.freeze)"""
+    if isinstance(model, torch.jit.ScriptModule):
+        # Poids inlinés en constantes, BatchNorm repliées dans les convolutions
+        return torch.jit.freeze(model.eval())
+    # Mode évaluation : en mode train, la BatchNorm dépendrait du contenu du lot
+    model.eval()
+    if fuse:
+        try:
+            model = fuse_conv_bn_fx(model)
+        except Exception as e:
+            print(f"Conv+BN fusion skipped: {e}")
+    for param in model.parameters():
+        # Hors du graphe autograd (detach_ vaut aussi pour les poids non-feuilles issus d'une fusion)
+        param.detach_()
+        if param.dim() == 4:
+            # Pas de model.to(channels_last) : YOLOv5 l'applique aussi à ses grilles d'ancres (5D)
+            param.data = param.data.contiguous(memory_format=torch.channels_last)
+    return model
 
 class MediaDetector:
     _instance = None
     _models_loaded = False
+    _in_worker = False
 
     def __new__(cls):
         if cls._instance is None:
@@ -18,99 +110,448 @@ class MediaDetector:
 
     def __init__(self):
         if not MediaDetector._models_loaded:
-            self.load_models()
+            # Classement par mots-clés du nom de fichier (categories.CATEGORIES)
+            self.filename_classifier = get_filename_classifier()
+            self.model_lock = threading.Lock()
+            if MediaDetector._in_worker or INFERENCE_WORKERS <= 0:
+                self.pool = None
+                if not MediaDetector._in_worker:
+                    # Inférence dans le processus du bot (les workers règlent leurs threads dans _init_worker)
+                    apply_runtime_profile(runtime_profile(1))
+                self.load_models()
+                self.models_resident = True
+            else:
+                # Les modèles vivent dans les workers, jamais dans le processus du bot
+                self.pool = InferencePool(INFERENCE_WORKERS)
+                self.yolo_model = None
+                self.resnet_model = None
+                self.confidence_threshold = 0.6
+            if not MediaDetector._in_worker:
+                # Fichiers résolus par chaque niveau de la cascade (fallback : modèles indisponibles, fichier illisible)
+                self.cascade_stats = {'filename': 0, 'resnet': 0, 'yolo': 0, 'fallback': 0}
+                # Fichiers passés par chaque modèle, quel que soit le niveau qui a décidé
+                self.model_runs = {'resnet': 0, 'yolo': 0}
+                # Classifications déjà connues des images republiées
+                self.classification_cache = PhashCache(MODEL_VERSION)
+                # File d'inférence commune à tous les jobs du bot
+                self.batcher = MicroBatcher(
+                    self._run_batch,
+                    max_size=MICRO_BATCH_MAX_SIZE,
+                    max_wait=MICRO_BATCH_MAX_WAIT,
+                    max_inflight=max(1, INFERENCE_WORKERS)
+                )
+                self.batch_size_calibrated = not DETECTOR_AUTOBATCH
+                self.calibration_lock = asyncio.Lock()
+                # Éviction des modèles inactifs
+                self.model_stats = {'evictions': 0, 'reloads': 0}
+                self.models_evicted = False
+                self.active_batches = 0
+                self.last_used = time.monotonic()
+                self.idle_task = None
             MediaDetector._models_loaded = True
 
     def load_models(self):
-        """Charge les modèles avec gestion du rate limit"""
+        """Charge les artefacts TorchScript si présents, sinon les modèles torch.hub, puis les préchauffe"""
         try:
             print("Loading AI models...")
-            
-            # Définir un dossier de cache permanent
-            self.cache_dir = Path("./model_cache")
-            self.cache_dir.mkdir(exist_ok=True)
-            
-            # Charger depuis le cache si possible
-            if (self.cache_dir / "yolov5s.pt").exists():
-                print("Loading YOLOv5 from cache...")
-                self.yolo_model = torch.hub.load('ultralytics/yolov5', 'yolov5s', trust_repo=True)
-            else:
-                print("Downloading YOLOv5 model...")
-                torch.hub.set_dir(str(self.cache_dir))
-                self.yolo_model = torch.hub.load('ultralytics/yolov5', 'yolov5s', trust_repo=True)
-
-            # Attendre un peu entre les téléchargements
-            time.sleep(2)
-            
-            # Charger ResNet avec cache local
-            if not (self.cache_dir / "resnet18.pth").exists():
-                print("Downloading ResNet model...")
-                self.resnet_model = torch.hub.load('pytorch/vision:v0.10.0', 'resnet18', pretrained=True)
-                torch.save(self.resnet_model.state_dict(), self.cache_dir / "resnet18.pth")
-            else:
-                print("Loading ResNet from cache...")
-                self.resnet_model = torch.hub.load('pytorch/vision:v0.10.0', 'resnet18', pretrained=False)
-                self.resnet_model.load_state_dict(torch.load(self.cache_dir / "resnet18.pth"))
-
+            start = time.perf_counter()
+            self.imagenet_mean = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+            self.imagenet_std = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+            self.build_category_matrix()
             self.confidence_threshold = 0.6
-            print("AI models loaded successfully!")
+
+            if not self.load_compiled_models():
+                self.load_eager_models()
+            self.prepare_models()
+            if QUANTIZE_MODE:
+                self.quantize_resnet()
+            elif DETECTOR_QUANTIZE:
+                print(f"Warning: DETECTOR_QUANTIZE={DETECTOR_QUANTIZE!r} needs 'static' and calibration images "
+                      f"in {QUANTIZE_CALIBRATION_DIR}, keeping ResNet in fp32")
+            self.warmup()
+            print(f"AI models loaded successfully in {time.perf_counter() - start:.2f}s!")
 
         except Exception as e:
             print(f"Error loading models: {e}")
+            print("AI detection disabled, every file will be classified from its filename only")
             # Fallback à une version simplifiée si les modèles ne peuvent pas être chargés
             self.yolo_model = None
             self.resnet_model = None
             self.confidence_threshold = 0.6
 
+    def load_compiled_models(self) -> bool:
+        """Charge les modèles exportés par `python -m utils.model_export`, False s'il faut passer par torch.hub"""
+        if QUANTIZE_MODE:
+            # La quantification s'applique au module Python, pas à un graphe TorchScript
+            return False
+        compiled_dir = Path(COMPILED_MODELS_DIR)
+        yolo = load_artifact(compiled_dir / YOLO_ARTIFACT)
+        resnet = load_artifact(compiled_dir / RESNET_ARTIFACT)
+        if yolo is None or resnet is None:
+            print(f"No TorchScript artifacts in {compiled_dir}, using eager models")
+            return False
+        (self.yolo_model, _), (self.resnet_model, _) = yolo, resnet
+        print("Loaded TorchScript models from cache")
+        return True
+
+    def load_eager_models(self):
+        """Construit les modèles depuis les sources vendues et les poids locaux, sans accès réseau"""
+        missing = missing_weights()
+        if missing:
+            raise RuntimeError(f"missing model weights {', '.join(missing)}, run `python -m utils.model_loader`")
+        self.yolo_model = load_yolo_model()
+        self.resnet_model = load_resnet_model()
+        if self.yolo_model is None or self.resnet_model is None:
+            raise RuntimeError("model weights unreadable, see the errors above")
+
+    def prepare_models(self):
+        """Avant le premier lot : Conv+BN fusionnées, mode eval, paramètres figés, poids channels_last"""
+        # YOLOv5 est déjà fusionné au chargement par DetectMultiBackend (fuse=True dans le hubconf)
+        self.yolo_model = prepare_for_inference(self.yolo_model, fuse=False)
+        self.resnet_model = prepare_for_inference(self.resnet_model, fuse=True)
+
+    def warmup(self):
+        """Passages à vide au chargement : initialisations paresseuses et optimisation des graphes TorchScript"""
+        batch = torch.zeros(1, 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE, dtype=torch.uint8)
+        start = time.perf_counter()
+        for _ in range(WARMUP_ITERATIONS):
+            self.analyze_with_yolo(batch)
+            self.analyze_with_resnet(batch)
+        print(f"Models warmed up in {time.perf_counter() - start:.2f}s")
+
     async def analyze_media(self, file_data: bytes, filename: str) -> dict:
         """Analyse un fichier média avec gestion des erreurs"""
+        return (await self.analyze_batch([(file_data, filename)]))[0]
+
+    async def analyze_batch(self, items: List[Tuple[bytes, str]]) -> List[dict]:
+        """Analyse un lot de fichiers : nom de fichier, puis cache pHash, puis file d'inférence commune"""
+        filename_results = self.filename_classifier.classify_batch([filename for _, filename in items])
+        try:
+            # Premier niveau de la cascade : un nom explicite suffit, ni décodage ni inférence
+            results = [result if result['confidence'] >= CASCADE_FILENAME_THRESHOLD else None
+                       for result in filename_results]
+            pending = [i for i, result in enumerate(results) if result is None]
+            self.cascade_stats['filename'] += len(items) - len(pending)
+            if not pending:
+                return results
+
+            # Les images déjà vues (même à une autre résolution/compression) sautent l'inférence
+            hashes, cached = await asyncio.to_thread(
+                self.classification_cache.lookup_batch,
+                [None if self.is_video(items[i][1]) else items[i][0] for i in pending]
+            )
+            misses = []
+            for i, phash, result in zip(pending, hashes, cached):
+                if result is None:
+                    misses.append((i, phash))
+                else:
+                    # Même règle que combine_results : le nom de fichier garde la main s'il est plus sûr
+                    results[i] = self.prefer_confident(result, filename_results[i])
+            if misses:
+                await self.ensure_batch_size()
+                detections = await self.batcher.submit_many([items[i] for i, _ in misses])
+                for (i, _), detection in zip(misses, detections):
+                    results[i] = detection
+                    self.cascade_stats[detection.get('tier', 'fallback')] += 1
+                    # stage : dernier modèle exécuté pour ce fichier (YOLO ne passe qu'après ResNet)
+                    if detection.get('stage') in ('resnet', 'yolo'):
+                        self.model_runs['resnet'] += 1
+                    if detection.get('stage') == 'yolo':
+                        self.model_runs['yolo'] += 1
+                # Ne garder que les résultats des modèles, pas ceux déduits du nom de fichier
+                await asyncio.to_thread(self.classification_cache.store_batch, [
+                    (phash, results[i]) for i, phash in misses
+                    if phash and results[i].get('source') == 'model'
+                ])
+            return results
+        except Exception as e:
+            print(f"Error in analyze_batch: {e}")
+            return filename_results
+
+    async def _run_batch(self, items: List[Tuple[bytes, str]]) -> List[dict]:
+        """Exécute un lot formé par le batcher sans bloquer la boucle asyncio"""
+        if self.models_evicted:
+            # Le pool (ou les modèles du processus) se recharge à la demande pour ce lot
+            self.models_evicted = False
+            self.model_stats['reloads'] += 1
+        self.active_batches += 1
         try:
-            # Si les modèles n'ont pas pu être chargés, utiliser l'analyse basique
+            if self.pool is not None:
+                return await self.pool.classify_batch(items)
+            return await asyncio.to_thread(self.classify_batch, items)
+        finally:
+            self.active_batches -= 1
+            self.last_used = time.monotonic()
+            if MODEL_IDLE_TIMEOUT > 0 and (self.idle_task is None or self.idle_task.done()):
+                self.idle_task = asyncio.get_running_loop().create_task(self._evict_when_idle())
+
+    async def _evict_when_idle(self):
+        """Libère les modèles une fois MODEL_IDLE_TIMEOUT écoulé sans lot"""
+        while True:
+            idle = time.monotonic() - self.last_used
+            if self.active_batches == 0 and idle >= MODEL_IDLE_TIMEOUT:
+                self.evict_models()
+                return
+            await asyncio.sleep(max(MODEL_IDLE_TIMEOUT - idle, 1.0))
+
+    def evict_models(self):
+        """Arrête les workers d'inférence, ou décharge les modèles du processus s'il n'y en a pas"""
+        if self.pool is not None:
+            # La mémoire d'un worker n'est vraiment rendue au système qu'à la fin du processus
+            self.pool.shutdown(wait=False)
+        else:
+            with self.model_lock:
+                self.yolo_model = None
+                self.resnet_model = None
+                self.models_resident = False
+                gc.collect()
+        self.models_evicted = True
+        self.model_stats['evictions'] += 1
+        print(f"AI models evicted after {MODEL_IDLE_TIMEOUT:.0f}s idle")
+
+    def ensure_models(self):
+        """Recharge les modèles déchargés par evict_models (artefacts TorchScript locaux si présents)"""
+        with self.model_lock:
+            if not self.models_resident:
+                self.load_models()
+                self.models_resident = True
+
+    async def ensure_batch_size(self):
+        """Fixe la taille max des lots du batcher d'après la calibration (faite là où vivent les modèles)"""
+        if self.batch_size_calibrated:
+            return
+        async with self.calibration_lock:
+            if self.batch_size_calibrated:
+                return
+            try:
+                if self.pool is not None:
+                    self.batcher.max_size = await self.pool.calibrate_batch_size()
+                else:
+                    self.batcher.max_size = await asyncio.to_thread(self.calibrate_batch_size)
+            except Exception as e:
+                print(f"Error calibrating batch size, keeping {self.batcher.max_size}: {e}")
+            self.batch_size_calibrated = True
+
+    def calibrate_batch_size(self) -> int:
+        """Taille de lot au meilleur débit sous DETECTOR_BATCH_LATENCY_BUDGET, mesurée une fois par machine (bloquant)"""
+        self.ensure_models()
+        if self.yolo_model is None or self.resnet_model is None:
+            return MICRO_BATCH_MAX_SIZE
+        fingerprint = host_fingerprint(
+            model_version=MODEL_VERSION,
+            compiled=isinstance(self.yolo_model, torch.jit.ScriptModule),
+            intra_op_threads=torch.get_num_threads(),
+            inter_op_threads=torch.get_num_interop_threads(),
+            latency_budget=DETECTOR_BATCH_LATENCY_BUDGET,
+        )
+        batch_size = load_batch_size(fingerprint)
+        if batch_size:
+            print(f"Detector batch size {batch_size} (calibrated for this host)")
+            return batch_size
+
+        print("Calibrating detector batch size...")
+        # Pire cas de la cascade : ResNet puis YOLO sur toutes les images du lot
+        synthetic = torch.randint(0, 256, (max(AUTOBATCH_SIZES), 3, YOLO_IMG_SIZE, YOLO_IMG_SIZE), dtype=torch.uint8)
+        synthetic = synthetic.contiguous(memory_format=torch.channels_last)
+
+        def run(size: int):
+            self.analyze_with_resnet(synthetic[:size])
+            self.analyze_with_yolo(synthetic[:size])
+
+        timings = profile_batch_sizes(run, DETECTOR_BATCH_LATENCY_BUDGET)
+        batch_size = select_batch_size(timings, DETECTOR_BATCH_LATENCY_BUDGET)
+        save_batch_size(fingerprint, batch_size, timings)
+        print(f"Detector batch size {batch_size} ({', '.join(f'{n}: {t:.2f}s' for n, t in timings.items())})")
+        return batch_size
+
+    def classify_batch(self, items: List[Tuple[bytes, str]]) -> List[dict]:
+        """Analyse un lot de fichiers en cascade ResNet puis YOLO, un seul passage par modèle (bloquant).
+
+        tier : niveau qui a décidé du résultat, stage : dernier modèle exécuté sur le fichier.
+        """
+        filename_results = self.filename_classifier.classify_batch([filename for _, filename in items])
+        fallbacks = [dict(result, tier='fallback') for result in filename_results]
+        try:
+            self.ensure_models()
+            # Si les modèles n'ont pas pu être chargés, classer d'après le nom de fichier
             if self.yolo_model is None or self.resnet_model is None:
-                return self.basic_analysis(filename)
+                return fallbacks
+
+            # Décoder images et images clés des vidéos, les fichiers illisibles sont classés d'après leur nom
+            results = [None] * len(items)
+            frames, owners = [], []
+            for i, (file_data, filename) in enumerate(items):
+                decoded = self.decode_frames(file_data, filename)
+                if not decoded:
+                    results[i] = fallbacks[i]
+                frames.extend(decoded)
+                owners.extend([i] * len(decoded))
 
-            # Analyse normale avec les modèles
-            image = Image.open(io.BytesIO(file_data))
-            yolo_results = self.yolo_model(image)
-            resnet_results = self.analyze_with_resnet(image)
-            return self.combine_results(yolo_results, resnet_results, filename)
+            if not frames:
+                return results
+
+            # Deuxième niveau : ResNet sur toutes les images du lot en une fois
+            batch = self.preprocess(frames)
+            resnet_results = self.analyze_with_resnet(batch)
+            frame_results = {}
+            for i, resnet in zip(owners, resnet_results):
+                frame_results.setdefault(i, []).append(self.combine_results(None, resnet, filename_results[i]))
+            for i, detections in frame_results.items():
+                results[i] = self.decided(self.aggregate_results(detections), 'resnet')
+
+            # Troisième niveau : YOLO seulement sur les images des fichiers dont ResNet n'est pas sûr
+            unsure = {i for i in frame_results if results[i]['confidence'] < CASCADE_RESNET_THRESHOLD}
+            if unsure:
+                selected = [f for f, i in enumerate(owners) if i in unsure]
+                yolo_results = self.analyze_with_yolo(batch[selected])
+                frame_results = {}
+                for f, yolo in zip(selected, yolo_results):
+                    i = owners[f]
+                    frame_results.setdefault(i, []).append(
+                        self.combine_results(yolo, resnet_results[f], filename_results[i]))
+                for i, detections in frame_results.items():
+                    results[i] = self.decided(self.aggregate_results(detections), 'yolo')
+            return results
 
         except Exception as e:
-            print(f"Error in analyze_media: {e}")
-            return self.basic_analysis(filename)
-
-    def basic_analysis(self, filename: str) -> dict:
-        """Analyse basique basée sur le nom de fichier"""
-        filename_lower = filename.lower()
-        
-        # Détection basique des jeux
-        if 'valorant' in filename_lower:
-            return {"confidence": 0.8, "category": "Games", "subcategory": "Valorant"}
-        elif 'minecraft' in filename_lower:
-            return {"confidence": 0.8, "category": "Games", "subcategory": "Minecraft"}
-        elif 'lol' in filename_lower or 'league' in filename_lower:
-            return {"confidence": 0.8, "category": "Games", "subcategory": "League of Legends"}
-        elif 'fortnite' in filename_lower:
-            return {"confidence": 0.8, "category": "Games", "subcategory": "Fortnite"}
-        
-        # Détection basique des applications
-        elif 'discord' in filename_lower:
-            return {"confidence": 0.8, "category": "Apps", "subcategory": "Discord"}
-        elif 'screenshot' in filename_lower:
-            return {"confidence": 0.7, "category": "Screenshots", "subcategory": "System"}
-        
-        return {"confidence": 0.5, "category": "Others", "subcategory": "Unknown"}
-
-    def analyze_with_resnet(self, image):
-        """Analyse avec ResNet"""
+            print(f"Error in classify_batch: {e}")
+            return fallbacks
+
+    @staticmethod
+    def decided(result: dict, stage: str) -> dict:
+        """Résultat annoté du niveau qui l'a décidé : le nom de fichier peut l'emporter sur le modèle exécuté"""
+        tier = stage if result.get('source') == 'model' else 'filename'
+        return dict(result, tier=tier, stage=stage)
+
+    def is_video(self, filename: str) -> bool:
+        return os.path.splitext(filename.lower())[1] in VIDEO_EXTENSIONS
+
+    def decode_frames(self, file_data: bytes, filename: str) -> List[np.ndarray]:
+        """Images à analyser pour un fichier : l'image elle-même, quelques images d'une animation ou d'une vidéo"""
+        if self.is_video(filename):
+            ext = os.path.splitext(filename.lower())[1]
+            return decode_video_frames(file_data, VIDEO_MAX_FRAMES, YOLO_IMG_SIZE, suffix=ext)
+        return decode_image_frames(file_data, ANIMATION_MAX_FRAMES, YOLO_IMG_SIZE)
+
+    def aggregate_results(self, detections: List[dict]) -> dict:
+        """Vote pondéré par la confiance entre les images d'un même fichier"""
+        if len(detections) == 1:
+            return detections[0]
+        votes, sources = {}, {}
+        for detection in detections:
+            label = (detection['category'], detection['subcategory'])
+            votes[label] = votes.get(label, 0.0) + detection['confidence']
+            sources.setdefault(label, detection.get('source'))
+        (category, subcategory), score = max(votes.items(), key=lambda vote: vote[1])
+        return {"confidence": score / len(detections), "category": category, "subcategory": subcategory,
+                "source": sources[(category, subcategory)]}
+
+    def get_metrics(self) -> dict:
+        """Métriques du détecteur (processus principal)"""
+        resolved = sum(self.cascade_stats.values())
+        main_rss = psutil.Process().memory_info().rss
+        worker_rss = self.pool.worker_rss() if self.pool is not None else []
+        return {
+            'batches': dict(self.batcher.stats, max_size=self.batcher.max_size),
+            'runtime': runtime_profile(max(1, INFERENCE_WORKERS)),
+            'phash_cache': dict(self.classification_cache.stats, hit_rate=round(self.classification_cache.hit_rate, 3)),
+            'cascade': dict(
+                self.cascade_stats,
+                hit_rates={tier: round(count / resolved, 3) if resolved else 0.0
+                           for tier, count in self.cascade_stats.items()},
+                model_runs=dict(self.model_runs),
+                # Fichiers qui ne sont pas passés par ce modèle
+                resnet_skipped=resolved - self.model_runs['resnet'],
+                yolo_skipped=resolved - self.model_runs['yolo'],
+            ),
+            'models': dict(
+                self.model_stats,
+                resident=self.pool.executor is not None if self.pool is not None else self.models_resident,
+                idle_seconds=round(time.monotonic() - self.last_used, 1),
+                rss_mb={'main': round(main_rss / 2**20, 1), 'workers': [round(rss / 2**20, 1) for rss in worker_rss]},
+            ),
+        }
+
+    def preprocess(self, frames: List[np.ndarray]) -> torch.Tensor:
+        """Letterbox toutes les images du lot directement dans un seul tenseur uint8 NCHW"""
+        batch, _, _ = letterbox_batch(frames, YOLO_IMG_SIZE)
+        return batch
+
+    def analyze_with_yolo(self, batch: torch.Tensor) -> list:
+        """Analyse avec YOLOv5 : (dossier de CATEGORIES, score) de la meilleure détection reconnue par image"""
+        x = batch.float().div_(255)
+        with torch.inference_mode():
+            pred = self.yolo_model(x)
+        if isinstance(pred, (list, tuple)):
+            pred = pred[0]
+        results = []
+        for det in non_max_suppression(pred, conf_thres=0.25, iou_thres=0.45, classes=list(COCO_CATEGORIES)):
+            best = None
+            for *_, conf, cls in det.tolist():
+                key = COCO_CATEGORIES.get(int(cls))
+                if key and (best is None or conf > best[1]):
+                    best = (CATEGORIES[key], conf)
+            results.append(best)
+        return results
+
+    def build_category_matrix(self):
+        """Matrice (classes ImageNet x dossiers) pour agréger les probabilités en une multiplication"""
+        self.category_paths = sorted(set(CATEGORIES[key] for key in IMAGENET_CATEGORIES.values()))
+        self.category_matrix = torch.zeros(1000, len(self.category_paths))
+        for class_index, key in IMAGENET_CATEGORIES.items():
+            self.category_matrix[class_index, self.category_paths.index(CATEGORIES[key])] = 1.0
+
+    def resnet_input(self, batch: torch.Tensor) -> torch.Tensor:
+        """Redimensionnement et normalisation vectorisés sur tout le lot"""
+        x = F.interpolate(batch.float().div_(255), size=(RESNET_IMG_SIZE, RESNET_IMG_SIZE),
+                          mode='bilinear', align_corners=False, antialias=True)
+        return ((x - self.imagenet_mean) / self.imagenet_std).contiguous(memory_format=torch.channels_last)
+
+    def analyze_with_resnet(self, batch: torch.Tensor) -> list:
+        """Analyse avec ResNet : (dossier de CATEGORIES, score) pour chaque image du lot"""
         if self.resnet_model is None:
-            return None
-        # ... reste du code ResNet ...
-        return None
-
-    def combine_results(self, yolo_results, resnet_results, filename: str) -> dict:
-        """Combine les résultats ou utilise l'analyse basique si nécessaire"""
-        if yolo_results is None or resnet_results is None:
-            return self.basic_analysis(filename)
-        # ... reste du code de combinaison ...
-        return self.basic_analysis(filename)  # Temporairement, utiliser l'analyse basique 
\ No newline at end of file
+            return [None] * len(batch)
+        x = self.resnet_input(batch)
+        with torch.inference_mode():
+            scores = self.resnet_model(x).softmax(1) @ self.category_matrix
+        best_scores, best = scores.max(1)
+        return [(self.category_paths[j], score) for j, score in zip(best.tolist(), best_scores.tolist())]
+
+    def calibration_batches(self, directory: str = QUANTIZE_CALIBRATION_DIR, limit: int = QUANTIZE_CALIBRATION_IMAGES) -> List[torch.Tensor]:
+        """Entrées ResNet construites à partir des images locales de calibration"""
+        frames = []
+        for path in calibration_files(directory, limit):
+            image = decode_image(path.read_bytes(), YOLO_IMG_SIZE)
+            if image is not None:
+                frames.append(image)
+        return [self.resnet_input(self.preprocess(frames[i:i + 16])) for i in range(0, len(frames), 16)]
+
+    def quantize_resnet(self):
+        """Remplace ResNet par sa version int8 statique, calibrée sur les images de QUANTIZE_CALIBRATION_DIR"""
+        try:
+            batches = self.calibration_batches()
+            if not batches:
+                raise ValueError(f"no decodable calibration images in {QUANTIZE_CALIBRATION_DIR}")
+            self.resnet_model = quantize_static(self.resnet_model, batches)
+            print(f"ResNet quantized (static int8, {sum(len(b) for b in batches)} calibration images)")
+        except Exception as e:
+            # MODEL_VERSION annonce déjà la quantification : les classements restent étiquetés 'static'
+            print(f"Error quantizing ResNet, keeping fp32: {e}")
+
+    def prefer_confident(self, known_result: dict, filename_result: dict) -> dict:
+        """Résultat déjà connu des modèles (cache, store) face au nom de fichier, comme combine_results"""
+        # Le nom de fichier reste prioritaire à confiance égale
+        return known_result if known_result['confidence'] > filename_result['confidence'] else filename_result
+
+    def combine_results(self, yolo_results, resnet_results, filename_result: dict) -> dict:
+        """Garde le résultat le plus sûr entre le nom de fichier, ResNet et YOLO"""
+        best = filename_result
+        for model_result in (resnet_results, yolo_results):
+            if model_result is None:
+                continue
+            category_path, score = model_result
+            # Le nom de fichier reste prioritaire à confiance égale
+            if score > best['confidence']:
+                category, subcategory = split_category_path(category_path)
+                best = {"confidence": score, "category": category, "subcategory": subcategory, "source": "model"}
+        return best
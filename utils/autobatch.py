@@ -0,0 +1,86 @@
+"""
+Taille de lot CPU calibrée au démarrage : débit maximal sous un budget de latence, mémorisée par machine
+"""
+import hashlib
+import json
+import os
+import platform
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+import torch
+
+AUTOBATCH_CACHE_PATH = "cache/autobatch.json"
+AUTOBATCH_SIZES = (1, 2, 4, 8, 16, 32)
+AUTOBATCH_REPEAT = 2
+
+def cpu_model() -> str:
+    try:
+        with open('/proc/cpuinfo', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+def host_fingerprint(**settings) -> str:
+    """Machine (nom, CPU, cœurs, torch) et réglages qui influent sur les temps mesurés"""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    key = [platform.node(), cpu_model(), cores, torch.__version__, sorted(settings.items())]
+    return hashlib.sha256(json.dumps(key, default=str).encode()).hexdigest()[:16]
+
+def profile_batch_sizes(run: Callable[[int], None], latency_budget: float,
+                        sizes: Iterable[int] = AUTOBATCH_SIZES, repeat: int = AUTOBATCH_REPEAT) -> Dict[int, float]:
+    """Meilleur temps (s) de `run(n)` pour chaque taille, arrêté à la première qui dépasse le budget"""
+    timings = {}
+    for size in sizes:
+        run(size)  # Allocations et chemins de code propres à cette taille
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run(size)
+            best = min(best, time.perf_counter() - start)
+        timings[size] = best
+        if best > latency_budget:
+            # Les lots plus grands ne seront pas plus rapides
+            break
+    return timings
+
+def select_batch_size(timings: Dict[int, float], latency_budget: float) -> int:
+    """Taille au meilleur débit parmi celles qui tiennent le budget (la plus petite si aucune)"""
+    within = {size: seconds for size, seconds in timings.items() if seconds <= latency_budget}
+    if not within:
+        return min(timings)
+    return max(within, key=lambda size: size / within[size])
+
+def load_batch_size(fingerprint: str, path: str = AUTOBATCH_CACHE_PATH) -> Optional[int]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            entry = json.load(f).get(fingerprint)
+    except (OSError, ValueError):
+        return None
+    return entry['batch_size'] if entry else None
+
+def save_batch_size(fingerprint: str, batch_size: int, timings: Dict[int, float], path: str = AUTOBATCH_CACHE_PATH):
+    """Ajoute le résultat au fichier (une entrée par machine et réglages)"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        entries = {}
+    entries[fingerprint] = {
+        'batch_size': batch_size,
+        'timings': {str(size): round(seconds, 4) for size, seconds in timings.items()},
+        'calibrated_at': time.time(),
+    }
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Écriture atomique pour ne jamais laisser un fichier tronqué
+        tmp_path = Path(path).with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error saving batch size calibration: {e}")
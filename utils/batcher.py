@@ -0,0 +1,76 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List
+
+class MicroBatcher:
+    """File d'attente commune qui regroupe les requêtes de tous les jobs en lots.
+
+    Un lot part dès qu'il atteint `max_size` éléments ou que le plus ancien
+    attend depuis `max_wait` secondes, au plus `max_inflight` lots à la fois.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_size: int = 16, max_wait: float = 0.05, max_inflight: int = 1):
+        self.handler = handler
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.max_inflight = max_inflight
+        self.loop = None
+        self.task = None
+        self.pending = set()
+        self.stats = {'batches': 0, 'items': 0}
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.loop is not loop:
+            self.loop = loop
+            self.queue = asyncio.Queue()
+            self.inflight = asyncio.Semaphore(self.max_inflight)
+            self.task = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Ajoute un élément à la file et attend son résultat"""
+        self._ensure_started()
+        future = self.loop.create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        return await asyncio.gather(*(self.submit(item) for item in items))
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = self.loop.time() + self.max_wait
+            while len(batch) < self.max_size:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Les requêtes annulées entre-temps ne coûtent pas d'inférence
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+
+            await self.inflight.acquire()
+            task = self.loop.create_task(self._dispatch(batch))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            self.stats['batches'] += 1
+            self.stats['items'] += len(batch)
+            results = await self.handler([item for item, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.inflight.release()
@@ -1,37 +1,136 @@
-import aiohttp
-from typing import Dict, List, Tuple
+import asyncio
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple, Union
 import discord
-import zipfile
+import hashlib
 import io
+import zipfile
+import tempfile
 import os
 from datetime import datetime
-from .ai_detector import MediaDetector
+from .ai_detector import CASCADE_FILENAME_THRESHOLD, MODEL_VERSION, MediaDetector
+from .classification_store import get_classification_store
+from .upload_cache import get_upload_cache
+from .upload_hosts import get_upload_router
+
+# Pipeline lecture -> classification -> ZIP
+PIPELINE_QUEUE_SIZE = 8  # Nombre max de fichiers en attente entre deux étapes
+READ_WORKERS = 4  # Téléchargements d'attachments en parallèle
+CLASSIFY_WORKERS = 2  # Classifications en parallèle
+CLASSIFY_BATCH_SIZE = 8  # Fichiers envoyés ensemble au détecteur
+
+# Au-delà de cette taille, le ZIP en construction passe de la RAM au disque
+ZIP_SPOOL_THRESHOLD = 64 * 1024 * 1024  # 64MB
+
+_END = object()  # Marqueur de fin de flux entre les étapes
+
+class ZipSpool:
+    """Flux d'écriture du ZIP : un BytesIO, remplacé par un fichier temporaire dès qu'il dépasse max_size"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.stream = io.BytesIO()
+
+    def write(self, data) -> int:
+        if isinstance(self.stream, io.BytesIO) and self.stream.tell() + len(data) > self.max_size:
+            disk = tempfile.TemporaryFile(suffix='.zip')
+            disk.write(self.stream.getvalue())
+            disk.seek(self.stream.tell())
+            self.stream = disk
+        return self.stream.write(data)
+
+    def tell(self) -> int:
+        return self.stream.tell()
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self.stream.seek(offset, whence)
+
+    def seekable(self) -> bool:
+        return True
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
 
 class CatboxUploader:
     def __init__(self):
-        self.upload_url = "https://catbox.moe/user/api.php"
+        self.router = get_upload_router()
         self.detector = MediaDetector()
+        self.upload_cache = get_upload_cache()
+        self.store = get_classification_store()
         self.media_types = {
             'images': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'],
             'videos': ['.mp4', '.webm', '.mov', '.avi', '.mkv']
         }
 
-    async def analyze_and_sort_file(self, file_data: bytes, filename: str) -> Tuple[str, str, str]:
+    async def analyze_and_sort_file(self, file_data: bytes, filename: str, attachment_id: Optional[int] = None) -> Tuple[str, str, str]:
         """Analyse et détermine le chemin de classement du fichier"""
-        # Déterminer le type principal (Image/Video)
-        ext = os.path.splitext(filename.lower())[1]
-        main_type = 'Images' if ext in self.media_types['images'] else 'Videos'
-        
-        # Analyser avec l'IA
-        detection = await self.detector.analyze_media(file_data, filename)
-        
-        # Construire le chemin
-        if detection['confidence'] > 0.6:
-            return main_type, detection['category'], detection['subcategory']
-        return main_type, 'Others', 'Unknown'
+        return (await self.analyze_and_sort_files([(file_data, filename)], [attachment_id]))[0]
+
+    async def analyze_and_sort_files(self, files: List[Tuple[bytes, str]], attachment_ids: Optional[List[Optional[int]]] = None) -> List[Tuple[str, str, str]]:
+        """Analyse un lot de fichiers et détermine leurs chemins de classement"""
+        attachment_ids = attachment_ids or [None] * len(files)
+        detections = await self.classify_with_store(files, attachment_ids)
+
+        classifications = []
+        for (_, filename), detection in zip(files, detections):
+            # Déterminer le type principal (Image/Video)
+            ext = os.path.splitext(filename.lower())[1]
+            main_type = 'Images' if ext in self.media_types['images'] else 'Videos'
+
+            # Construire le chemin
+            if detection['confidence'] > 0.6:
+                classifications.append((main_type, detection['category'], detection['subcategory']))
+            else:
+                classifications.append((main_type, 'Others', 'Unknown'))
+        return classifications
+
+    async def classify_with_store(self, files: List[Tuple[bytes, str]], attachment_ids: List[Optional[int]]) -> List[dict]:
+        """Classements déjà enregistrés (ID d'attachment ou contenu identique), l'IA seulement pour les autres"""
+        # Un nom de fichier explicite décide seul, comme le premier niveau de la cascade du détecteur
+        filename_results = self.detector.filename_classifier.classify_batch([filename for _, filename in files])
+        undecided = [result['confidence'] < CASCADE_FILENAME_THRESHOLD for result in filename_results]
+        keys = await asyncio.to_thread(self.store_keys, files, attachment_ids)
+        known = await asyncio.to_thread(
+            self.store.get_many, [key for k, lookup in zip(keys, undecided) if lookup for key in k], MODEL_VERSION
+        )
+        detections = []
+        for k, filename_result in zip(keys, filename_results):
+            stored = next((known[key] for key in k if key in known), None)
+            # Un classement enregistré ne remplace le nom de fichier que s'il est plus sûr
+            detections.append(self.detector.prefer_confident(dict(stored, source='model'), filename_result)
+                              if stored is not None else None)
 
-    async def create_zip(self, files: List[Tuple[str, bytes, str]], timestamp: str) -> Tuple[bytes, Dict]:
-        """Crée un ZIP organisé et retourne les statistiques"""
+        misses = [i for i, detection in enumerate(detections) if detection is None]
+        if misses:
+            # Analyser avec l'IA, tout le lot en un appel
+            results = await self.detector.analyze_batch([files[i] for i in misses])
+            entries = []
+            for i, detection in zip(misses, results):
+                detections[i] = detection
+                # Seuls les classements du modèle sont enregistrés : une déduction du nom de fichier
+                # ne vaut pas pour le même contenu sous un autre nom, ni une fois les modèles disponibles
+                if detection.get('source') != 'model':
+                    continue
+                attachment_key, content_key = keys[i]
+                if attachment_key:
+                    entries.append((attachment_key, detection))
+                entries.append((content_key, detection))
+            await asyncio.to_thread(self.store.put_many, entries, MODEL_VERSION)
+        return detections
+
+    @staticmethod
+    def store_keys(files: List[Tuple[bytes, str]], attachment_ids: List[Optional[int]]) -> List[Tuple[Optional[str], str]]:
+        """(clé d'attachment, clé de contenu) de chaque fichier"""
+        return [
+            (f"attachment:{attachment_id}" if attachment_id is not None else None,
+             f"sha256:{hashlib.sha256(file_data).hexdigest()}")
+            for (file_data, _), attachment_id in zip(files, attachment_ids)
+        ]
+
+    async def create_zip(self, files: AsyncIterator[Tuple[str, bytes, Tuple[str, str, str]]], timestamp: str) -> Tuple[BinaryIO, Dict]:
+        """Crée un ZIP organisé au fil de l'eau et retourne le flux (rembobiné) et les statistiques"""
         stats = {
             'total': 0,
             'total_size': 0,
@@ -39,12 +138,31 @@ class CatboxUploader:
             'categories': {}
         }
         
-        zip_buffer = io.BytesIO()
+        # Reste en mémoire sous ZIP_SPOOL_THRESHOLD, bascule sur disque au-delà
+        zip_buffer = ZipSpool(ZIP_SPOOL_THRESHOLD)
+        try:
+            await self._write_zip(zip_buffer, files, timestamp, stats)
+        except BaseException:
+            zip_buffer.close()
+            raise
+
+        zip_buffer.seek(0)
+        # BytesIO ou fichier temporaire sur disque, selon la taille finale
+        return zip_buffer.stream, stats
+
+    async def _write_zip(self, zip_buffer: BinaryIO, files: AsyncIterator[Tuple[str, bytes, Tuple[str, str, str]]], timestamp: str, stats: Dict):
+        """Écrit les fichiers classés dans le ZIP et met à jour les statistiques"""
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for filename, file_data, (main_type, category, subcategory) in files:
-                # Créer le chemin dans le ZIP
+            async for filename, file_data, (main_type, category, subcategory) in files:
+                # Créer le chemin dans le ZIP (compression hors de la boucle asyncio)
                 zip_path = f"media_collection_{timestamp}/{main_type}/{category}/{subcategory}/{filename}"
-                zip_file.writestr(zip_path, file_data)
+                write = asyncio.ensure_future(asyncio.to_thread(zip_file.writestr, zip_path, file_data))
+                try:
+                    await asyncio.shield(write)
+                except asyncio.CancelledError:
+                    # Le thread écrit encore dans le flux : attendre qu'il ait fini avant de fermer le ZIP et le flux
+                    await asyncio.wait({write})
+                    raise
                 
                 # Mettre à jour les statistiques
                 file_size = len(file_data)
@@ -73,49 +191,103 @@ class CatboxUploader:
                     }
                 stats['categories'][category]['subcategories'][subcategory]['count'] += 1
                 stats['categories'][category]['subcategories'][subcategory]['size'] += file_size
-        
-        return zip_buffer.getvalue(), stats
 
     async def organize_and_upload(self, media_files: Dict[str, List[discord.Attachment]]) -> Tuple[Dict, str]:
         """Upload tous les fichiers dans un ZIP organisé"""
         try:
-            processed_files = []
-            for file_type, files in media_files.items():
-                for file in files:
+            # Même sélection d'attachments récemment uploadée : renvoyer le lien directement
+            cache_key = self.upload_cache.make_key(
+                (file.id for files in media_files.values() for file in files),
+                '+'.join(sorted(media_files))
+            )
+            cached = self.upload_cache.get(cache_key)
+            if cached:
+                print(f"Upload cache hit: {cached['url']}")
+                return cached['stats'], cached['url']
+
+            # Pipeline borné : lecture -> classification -> écriture ZIP.
+            # La mémoire dépend de la taille des files d'attente, pas du nombre de fichiers.
+            attachments = iter([file for files in media_files.values() for file in files])
+            read_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            zip_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+            async def reader():
+                for file in attachments:
                     print(f"Processing: {file.filename}")
-                    file_data = await file.read()
-                    classification = await self.analyze_and_sort_file(file_data, file.filename)
-                    processed_files.append((file.filename, file_data, classification))
-                    print(f"Classified {file.filename} as {classification}")
+                    await read_queue.put((file.filename, await file.read(), file.id))
 
-            # Créer le ZIP
+            async def classifier():
+                done = False
+                while not done:
+                    # Regrouper ce qui est déjà lu, sans attendre de remplir le lot
+                    batch = []
+                    item = await read_queue.get()
+                    while item is not _END:
+                        batch.append(item)
+                        if len(batch) >= CLASSIFY_BATCH_SIZE or read_queue.empty():
+                            break
+                        item = read_queue.get_nowait()
+                    done = item is _END
+                    if not batch:
+                        continue
+
+                    classifications = await self.analyze_and_sort_files(
+                        [(file_data, filename) for filename, file_data, _ in batch],
+                        [attachment_id for _, _, attachment_id in batch]
+                    )
+                    for (filename, file_data, _), classification in zip(batch, classifications):
+                        print(f"Classified {filename} as {classification}")
+                        await zip_queue.put((filename, file_data, classification))
+
+            async def read_stage(readers):
+                await asyncio.gather(*readers)
+                for _ in range(CLASSIFY_WORKERS):
+                    await read_queue.put(_END)
+
+            async def classify_stage(classifiers):
+                await asyncio.gather(*classifiers)
+                await zip_queue.put(_END)
+
+            async def classified_files():
+                while (item := await zip_queue.get()) is not _END:
+                    yield item
+
+            # Créer le ZIP pendant que les étapes précédentes tournent
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            zip_data, stats = await self.create_zip(processed_files, timestamp)
-            
-            # Upload le ZIP
+            # Chaque lecteur et classifieur est une tâche à part, annulable même si gather() a déjà échoué
+            readers = [asyncio.create_task(reader()) for _ in range(READ_WORKERS)]
+            classifiers = [asyncio.create_task(classifier()) for _ in range(CLASSIFY_WORKERS)]
+            zip_task = asyncio.create_task(self.create_zip(classified_files(), timestamp))
+            stages = [asyncio.create_task(read_stage(readers)), asyncio.create_task(classify_stage(classifiers)), zip_task]
+            try:
+                # S'arrêter dès qu'une étape échoue pour ne pas bloquer les autres
+                done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+                for stage in done:
+                    stage.result()
+                zip_stream, stats = zip_task.result()
+            finally:
+                tasks = readers + classifiers + stages
+                for task in tasks:
+                    task.cancel()
+                # Attendre la fin des tâches annulées : plus aucune ne garde de fichier lu en mémoire
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            # Upload le ZIP directement depuis le fichier temporaire
             zip_filename = f"media_collection_{timestamp}.zip"
-            url = await self.upload_file(zip_data, zip_filename)
-            
+            with zip_stream:
+                url = await self.upload_file(zip_stream, zip_filename)
+
+            self.upload_cache.set(cache_key, url, stats)
             return stats, url
 
         except Exception as e:
             print(f"Error in organize_and_upload: {e}")
             raise
 
-    async def upload_file(self, file_data: bytes, filename: str) -> str:
-        """Upload un fichier sur Catbox"""
+    async def upload_file(self, file_data: Union[bytes, BinaryIO], filename: str) -> str:
+        """Upload un fichier (contenu ou flux binaire ouvert) sur Catbox, avec bascule si indisponible"""
         try:
-            async with aiohttp.ClientSession() as session:
-                data = aiohttp.FormData()
-                data.add_field('reqtype', 'fileupload')
-                data.add_field('userhash', '')
-                data.add_field('fileToUpload', file_data, filename=filename)
-                
-                async with session.post(self.upload_url, data=data) as response:
-                    if response.status == 200:
-                        url = await response.text()
-                        return url
-                    raise Exception(f"Upload failed: {await response.text()}")
+            return await self.router.upload(file_data, filename)
         except Exception as e:
             print(f"Error uploading file: {e}")
-            raise 
\ No newline at end of file
+            raise
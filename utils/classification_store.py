@@ -0,0 +1,65 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+CLASSIFICATION_STORE_PATH = "cache/classifications.db"
+
+class ClassificationStore:
+    """Classements persistants par ID d'attachment ou empreinte du contenu (SQLite en mode WAL)"""
+
+    def __init__(self, path: str = CLASSIFICATION_STORE_PATH):
+        self.lock = threading.Lock()
+        self.stats = {'stale': 0}  # Lignes ignorées car produites par une autre version des modèles
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        # WAL : les lectures ne bloquent pas pendant l'écriture d'un lot
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS classifications ("
+            "key TEXT PRIMARY KEY, category TEXT, subcategory TEXT, confidence REAL, "
+            "model_version TEXT, updated_at REAL)"
+        )
+        self.db.commit()
+
+    def get_many(self, keys: Iterable[str], model_version: str) -> Dict[str, Dict]:
+        """Classements connus pour ces clés ; ceux d'une autre version des modèles sont ignorés"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            # Par paquets pour rester sous la limite de paramètres de SQLite
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self.db.execute(
+                    f"SELECT key, category, subcategory, confidence, model_version FROM classifications "
+                    f"WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, category, subcategory, confidence, version in rows:
+                    if version != model_version:
+                        self.stats['stale'] += 1
+                        continue
+                    found[key] = {"confidence": confidence, "category": category, "subcategory": subcategory}
+        return found
+
+    def put_many(self, entries: List[Tuple[str, Dict]], model_version: str):
+        """Enregistre des classements en une seule transaction (les lignes obsolètes sont remplacées)"""
+        if not entries:
+            return
+        now = time.time()
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, d['category'], d['subcategory'], d['confidence'], model_version, now) for key, d in entries]
+            )
+
+_classification_store = None
+
+def get_classification_store() -> ClassificationStore:
+    """Instance partagée par tous les uploaders du processus"""
+    global _classification_store
+    if _classification_store is None:
+        _classification_store = ClassificationStore()
+    return _classification_store
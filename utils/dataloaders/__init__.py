@@ -2,9 +2,11 @@
 Dataloaders module for YOLOv5 compatibility.
 This is a minimal implementation to satisfy imports.
 """
+from typing import List, Tuple
 from PIL import Image, ImageOps
 import numpy as np
 import cv2
+import torch
 
 def letterbox(im, new_shape=(640, 640), color=(114, 114, 114), auto=True, scaleFill=False, scaleup=True, stride=32):
     """
@@ -44,6 +46,49 @@ def letterbox(im, new_shape=(640, 640), color=(114, 114, 114), auto=True, scaleF
     im = cv2.copyMakeBorder(im, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
     return im, ratio, (dw, dh)
 
+def letterbox_batch(images: List[np.ndarray], new_shape=(640, 640), color=(114, 114, 114), scaleup=True) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Letterbox a list of HWC uint8 images straight into one preallocated batch (same geometry as letterbox(auto=False))
+    Returns:
+        batch (torch.Tensor): (N, 3, H, W) uint8, stored channels_last (the NHWC buffer the images were resized into)
+        ratios (torch.Tensor): (N, 2) width and height ratios between new and old dimensions
+        pads (torch.Tensor): (N, 2) (dw, dh) padding, the ratio_pad format of scale_boxes
+    """
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+    height, width = new_shape
+    uniform = len(set(color)) == 1
+    buffer = np.empty((len(images), height, width, 3), dtype=np.uint8)
+    ratios = torch.empty(len(images), 2)
+    pads = torch.empty(len(images), 2)
+
+    for i, im in enumerate(images):
+        shape = im.shape[:2]  # current shape [height, width]
+        r = min(height / shape[0], width / shape[1])
+        if not scaleup:  # only scale down, do not scale up
+            r = min(r, 1.0)
+        new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+        dw, dh = (width - new_unpad[0]) / 2, (height - new_unpad[1]) / 2
+        top, left = int(round(dh - 0.1)), int(round(dw - 0.1))
+        bottom, right = top + new_unpad[1], left + new_unpad[0]
+
+        # Bandes de remplissage seulement, l'image redimensionnée est écrite directement à sa place dans le lot
+        for band in (buffer[i, :top], buffer[i, bottom:], buffer[i, top:bottom, :left], buffer[i, top:bottom, right:]):
+            if uniform:
+                band.fill(color[0])  # memset, bien plus rapide que la diffusion d'un triplet
+            else:
+                band[...] = color
+        target = buffer[i, top:bottom, left:right]
+        if shape[::-1] != new_unpad:  # resize
+            cv2.resize(im, new_unpad, dst=target, interpolation=cv2.INTER_LINEAR)
+        else:
+            target[...] = im
+        ratios[i] = r
+        pads[i, 0], pads[i, 1] = dw, dh
+
+    # Vue NCHW sans copie : le tampon NHWC est déjà contigu au format channels_last
+    return torch.from_numpy(buffer).permute(0, 3, 1, 2), ratios, pads
+
 def exif_transpose(image):
     """
     Transpose a PIL image accordingly if it has an EXIF Orientation tag.
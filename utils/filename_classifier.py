@@ -0,0 +1,70 @@
+"""
+Classement des fichiers par mots-clés du nom, compilé à partir de categories.CATEGORIES
+"""
+import re
+from typing import Dict, List, Tuple
+
+from categories import CATEGORIES
+
+# Confiance d'une correspondance : un mot-clé avec sous-catégorie (jeu, application) est plus sûr
+# qu'un mot-clé générique ('clip', 'meme'...)
+KEYWORD_CONFIDENCE = 0.8
+GENERIC_KEYWORD_CONFIDENCE = 0.7
+UNKNOWN_CONFIDENCE = 0.5
+
+def split_category_path(path: str) -> Tuple[str, str]:
+    """'Games/Valorant' -> ('Games', 'Valorant'), 'Clips' -> ('Clips', 'General')"""
+    category, _, subcategory = path.partition('/')
+    return category, subcategory or 'General'
+
+class FilenameClassifier:
+    """Tous les mots-clés dans une seule expression régulière, appliquée à une liste de noms en un passage"""
+
+    def __init__(self, categories: Dict[str, str] = CATEGORIES):
+        # Priorité = ordre de la table (jeux, puis applications, puis catégories génériques)
+        self.priority = {keyword.lower(): rank for rank, keyword in enumerate(categories)}
+        self.detections = {}
+        for keyword, path in categories.items():
+            category, subcategory = split_category_path(path)
+            self.detections[keyword.lower()] = {
+                "confidence": KEYWORD_CONFIDENCE if '/' in path else GENERIC_KEYWORD_CONFIDENCE,
+                "category": category,
+                "subcategory": subcategory,
+                "source": "filename",
+            }
+        # Les plus longs d'abord, pour qu'un mot-clé préfixe d'un autre ne le masque pas
+        keywords = sorted(self.priority, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(map(re.escape, keywords)))
+
+    def classify(self, filename: str) -> dict:
+        return self.classify_batch([filename])[0]
+
+    def classify_batch(self, filenames: List[str]) -> List[dict]:
+        """Classe une liste de noms de fichiers avec une seule recherche sur leur concaténation"""
+        # Les mots-clés ne contiennent pas de '\n' : aucune correspondance ne chevauche deux noms
+        lowered = [filename.lower() for filename in filenames]
+        best = [None] * len(filenames)
+        # Les correspondances arrivent dans l'ordre du texte : on avance le fichier courant au fil de l'eau
+        i, end = 0, len(lowered[0]) if lowered else 0
+        for match in self.pattern.finditer('\n'.join(lowered)):
+            while match.start() > end:
+                i += 1
+                end += len(lowered[i]) + 1
+            keyword = match.group()
+            if best[i] is None or self.priority[keyword] < self.priority[best[i]]:
+                best[i] = keyword
+
+        return [
+            dict(self.detections[keyword]) if keyword else
+            {"confidence": UNKNOWN_CONFIDENCE, "category": "Others", "subcategory": "Unknown", "source": "filename"}
+            for keyword in best
+        ]
+
+_classifier = None
+
+def get_filename_classifier() -> FilenameClassifier:
+    """Classifieur partagé, compilé une seule fois"""
+    global _classifier
+    if _classifier is None:
+        _classifier = FilenameClassifier()
+    return _classifier
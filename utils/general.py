@@ -7,6 +7,7 @@ import threading
 import time
 import math
 import torch
+import torchvision
 import numpy as np
 import logging
 from pathlib import Path
@@ -27,6 +28,9 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 LOGGER.addHandler(handler)
 
+# Installation automatique des dépendances manquantes (désactivée par défaut : le démarrage ne doit pas dépendre du réseau)
+AUTOINSTALL = str(os.getenv('YOLOv5_AUTOINSTALL', False)).lower() == 'true'
+
 # Define ROOT
 FILE = Path(__file__).resolve()
 ROOT = FILE.parents[1]  # YOLOv5 root directory
@@ -102,22 +106,148 @@ def increment_path(path, exist_ok=False, sep='', mkdir=False):
     """Increment file or directory path."""
     return path
 
+def _broadcast(values, boxes):
+    """Met une valeur par image (N, k) en forme pour diffuser sur des boîtes (N, ..., 4)"""
+    return values.view(values.shape[:-1] + (1,) * (boxes.ndim - values.ndim) + values.shape[-1:])
+
 def scale_boxes(img1_shape, boxes, img0_shape, ratio_pad=None):
-    """Rescale boxes (xyxy) from img1_shape to img0_shape."""
+    """
+    Rescale boxes (xyxy) from img1_shape to img0_shape, in place.
+    img0_shape may be one (height, width) or one per image of a (N, ..., 4) batch; ratio_pad is
+    ((ratio_w, ratio_h), (pad_w, pad_h)) or the same pair of (N, 2) tensors returned by the batch letterbox.
+    """
+    b = boxes if isinstance(boxes, torch.Tensor) else torch.from_numpy(boxes)  # vue partagée sur le tableau numpy
+    if ratio_pad is None:  # calculate from img0_shape
+        shape = torch.as_tensor(img0_shape, dtype=b.dtype, device=b.device)
+        gain = torch.minimum(img1_shape[0] / shape[..., 0], img1_shape[1] / shape[..., 1])  # gain  = old / new
+        pad = torch.stack(((img1_shape[1] - shape[..., 1] * gain) / 2, (img1_shape[0] - shape[..., 0] * gain) / 2), -1)
+    else:
+        gain = torch.as_tensor(ratio_pad[0], dtype=b.dtype, device=b.device)[..., 0]
+        pad = torch.as_tensor(ratio_pad[1], dtype=b.dtype, device=b.device)
+    xyxy = b[..., :4]
+    xyxy.sub_(_broadcast(pad.repeat((1,) * (pad.ndim - 1) + (2,)), xyxy))  # (pad_w, pad_h, pad_w, pad_h)
+    xyxy.div_(_broadcast(gain.unsqueeze(-1), xyxy))
+    clip_boxes(b, img0_shape)
     return boxes
 
 def non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45, classes=None, agnostic=False, multi_label=False,
-                        labels=(), max_det=300):
-    """Runs Non-Maximum Suppression (NMS) on inference results."""
-    return prediction
+                        labels=(), max_det=300, nm=0):
+    """
+    Runs Non-Maximum Suppression (NMS) on inference results.
+    All images of the batch are filtered together and suppressed together, several images per torchvision nms call.
+    Returns:
+         list of detections, one (n, 6 + nm) tensor per image [xyxy, conf, cls, masks]
+    """
+    assert 0 <= conf_thres <= 1, f'Invalid Confidence threshold {conf_thres}, valid values are between 0.0 and 1.0'
+    assert 0 <= iou_thres <= 1, f'Invalid IoU {iou_thres}, valid values are between 0.0 and 1.0'
+    if isinstance(prediction, (list, tuple)):  # YOLOv5 model in validation model, output = (inference_out, loss_out)
+        prediction = prediction[0]  # select only inference output
+
+    bs = prediction.shape[0]  # batch size
+    nc = prediction.shape[2] - nm - 5  # number of classes
+    mi = 5 + nc  # mask start index
+    max_nms = 30000  # maximum number of boxes per image into NMS
+    max_chunk_nms = 256  # maximum number of boxes per nms call (several images per call)
+    multi_label &= nc > 1  # multiple labels per box
+
+    # Candidats de toutes les images à la fois, avec l'indice de leur image
+    xi, ai = (prediction[..., 4] > conf_thres).nonzero(as_tuple=True)
+    x = prediction[xi, ai]
+
+    # Cat apriori labels if autolabelling
+    if labels:
+        extra_x, extra_i = [x], [xi]
+        for i, lb in enumerate(labels):
+            if len(lb):
+                v = torch.zeros((len(lb), nc + nm + 5), device=x.device)
+                v[:, :4] = lb[:, 1:5]  # box
+                v[:, 4] = 1.0  # conf
+                v[range(len(lb)), lb[:, 0].long() + 5] = 1.0  # cls
+                extra_x.append(v)
+                extra_i.append(torch.full((len(lb),), i, dtype=xi.dtype, device=xi.device))
+        x, xi = torch.cat(extra_x), torch.cat(extra_i)
+
+    # Compute conf
+    x[:, 5:mi] *= x[:, 4:5]  # conf = obj_conf * cls_conf
+    box = xywh2xyxy(x[:, :4])  # (center x, center y, width, height) to (x1, y1, x2, y2)
+    mask = x[:, mi:]  # zero columns if no masks
+
+    # Detections matrix nx6 (xyxy, conf, cls)
+    if multi_label:
+        i, j = (x[:, 5:mi] > conf_thres).nonzero(as_tuple=False).T
+        x, xi = torch.cat((box[i], x[i, 5 + j, None], j[:, None].float(), mask[i]), 1), xi[i]
+    else:  # best class only
+        conf, j = x[:, 5:mi].max(1, keepdim=True)
+        keep = conf.view(-1) > conf_thres
+        x, xi = torch.cat((box, conf, j.float(), mask), 1)[keep], xi[keep]
+
+    # Filter by class
+    if classes is not None:
+        keep = (x[:, 5:6] == torch.tensor(classes, device=x.device)).any(1)
+        x, xi = x[keep], xi[keep]
+
+    # Sort by confidence and remove excess boxes (per image)
+    order = x[:, 4].argsort(descending=True)
+    x, xi = x[order], xi[order]
+    if len(x) > max_nms:
+        keep = _rank_per_image(xi, bs) < max_nms
+        x, xi = x[keep], xi[keep]
+
+    # Batched NMS : un groupe par (image, classe), ou par image si agnostic. nms étant quadratique en nombre de
+    # boîtes, les images consécutives sont regroupées en paquets d'au plus max_chunk_nms boîtes, un appel par paquet
+    order = xi.argsort(stable=True)  # par image, scores décroissants au sein de chaque image
+    x, xi = x[order], xi[order]
+    groups = xi if agnostic else xi * nc + x[:, 5].long()
+    keep, start = [], 0
+    for end in _chunk_bounds(torch.bincount(xi, minlength=bs).tolist(), max_chunk_nms):
+        # Boîtes décalées par groupe pour qu'aucun groupe n'en chevauche un autre
+        # (float64 pour garder la précision malgré les grands décalages)
+        b, g = x[start:end, :4].double(), groups[start:end].double()
+        i = torchvision.ops.nms(b + g[:, None] * (b.max() - b.min() + 1), x[start:end, 4].double(), iou_thres)
+        keep.append(i + start)
+        start = end
+    keep = torch.cat(keep) if keep else xi.new_zeros(0)  # sorted by decreasing score within each image
+    keep = keep[_rank_per_image(xi[keep], bs) < max_det]  # limit detections
+    x, xi = x[keep], xi[keep]
+
+    # Regrouper par image en conservant l'ordre des scores
+    order = xi.argsort(stable=True)
+    return list(x[order].split(torch.bincount(xi, minlength=bs).tolist()))
+
+def _chunk_bounds(counts, max_boxes):
+    """Fins des paquets d'images consécutives totalisant au plus max_boxes boîtes (une image plus grosse reste seule)"""
+    bounds, total, size = [], 0, 0
+    for n in counts:
+        if size and size + n > max_boxes:
+            bounds.append(total)
+            size = 0
+        total += n
+        size += n
+    if size:
+        bounds.append(total)
+    return bounds
+
+def _rank_per_image(image_index, bs):
+    """Rang de chaque élément parmi ceux de la même image, dans l'ordre donné"""
+    order = image_index.argsort(stable=True)
+    counts = torch.bincount(image_index, minlength=bs)
+    starts = counts.cumsum(0) - counts
+    rank = torch.empty_like(image_index)
+    rank[order] = torch.arange(len(image_index), device=image_index.device) - starts[image_index[order]]
+    return rank
 
 def clip_boxes(boxes, shape):
-    """Clip boxes (xyxy) to image shape (height, width)."""
+    """Clip boxes (xyxy) to image shape (height, width), or to one shape per image of a (N, ..., 4) batch, in place."""
+    b = boxes if isinstance(boxes, torch.Tensor) else torch.from_numpy(boxes)  # vue partagée sur le tableau numpy
+    shape = torch.as_tensor(shape, dtype=b.dtype, device=b.device)
+    xyxy = b[..., :4]
+    upper = _broadcast(shape.flip(-1).repeat((1,) * (shape.ndim - 1) + (2,)), xyxy)  # (w, h, w, h)
+    xyxy.clamp_(min=torch.zeros_like(upper), max=upper)
     return boxes
 
 def scale_coords(img1_shape, coords, img0_shape, ratio_pad=None):
-    """Rescale coords (xyxy) from img1_shape to img0_shape."""
-    return coords
+    """Rescale coords (xyxy) from img1_shape to img0_shape (former name of scale_boxes)."""
+    return scale_boxes(img1_shape, coords, img0_shape, ratio_pad)
 
 def xyxy2xywh(x):
     """Convert nx4 boxes from [x1, y1, x2, y2] to [x, y, w, h] where xy1=top-left, xy2=bottom-right."""
@@ -158,6 +288,8 @@ def check_requirements(requirements=[], exclude=(), install=True, cmds=''):
     try:
         # Si le premier requirement est un fichier requirements.txt
         if requirements and requirements[0].endswith('.txt'):
+            if not (install and AUTOINSTALL):
+                return None
             LOGGER.info(f'Installing dependencies from: {requirements[0]}')
             try:
                 subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', requirements[0]])
@@ -178,7 +310,7 @@ def check_requirements(requirements=[], exclude=(), install=True, cmds=''):
             except Exception:
                 missing.append(r)
         
-        if install and missing:
+        if install and AUTOINSTALL and missing:
             LOGGER.info(f'Installing dependencies: {", ".join(missing)}')
             try:
                 subprocess.check_call([sys.executable, '-m', 'pip', 'install', *missing])
@@ -0,0 +1,183 @@
+import asyncio
+import multiprocessing as mp
+import multiprocessing.forkserver
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import List, Tuple
+
+import psutil
+
+# forkserver : les modèles sont chargés une fois dans le forkserver (utils.model_preload) et les workers,
+# forkés à partir de lui, partagent leurs poids. spawn (hors Linux) : une copie complète par worker
+INFERENCE_START_METHOD = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+MODEL_PRELOAD_MODULE = f"{__package__}.model_preload"
+WORKER_START_TIMEOUT = 120  # Secondes d'attente max de l'initialisation des workers au démarrage du pool
+# Arrêter aussi le forkserver à l'éviction pour libérer sa copie des modèles. Le forkserver est commun
+# à tout le processus : désactiver si autre chose que ce pool utilise le contexte 'forkserver'
+INFERENCE_STOP_FORKSERVER = os.getenv('INFERENCE_STOP_FORKSERVER', '1').lower() in ('1', 'true', 'yes')
+
+# Détecteur propre à chaque processus worker
+_detector = None
+
+def _init_worker(worker_counter=None, worker_pids=None):
+    """Règle les threads torch et charge les modèles du worker (déjà chargés s'il est issu du forkserver)"""
+    global _detector
+    from .ai_detector import INFERENCE_WORKERS, MediaDetector
+    from .runtime_profile import apply_runtime_profile, runtime_profile
+    if worker_counter is not None:
+        # Rang du worker dans le pool, pour lui attribuer ses propres cœurs
+        with worker_counter.get_lock():
+            worker_index = worker_counter.value
+            worker_counter.value += 1
+        worker_pids[worker_index % len(worker_pids)] = os.getpid()
+        profile = runtime_profile(INFERENCE_WORKERS, worker_index % max(1, INFERENCE_WORKERS))
+    else:
+        # Préchargement du forkserver : chargement et préchauffage sur un seul thread, car un pool de threads
+        # OpenMP existant au moment du fork bloquerait le premier calcul parallèle des workers
+        profile = dict(runtime_profile(INFERENCE_WORKERS), intra_op_threads=1)
+    apply_runtime_profile(profile)
+    if _detector is None:
+        MediaDetector._in_worker = True
+        _detector = MediaDetector()
+
+def _classify_shared(shm_name: str, layout: List[Tuple[int, int, str]]) -> List[dict]:
+    """Classe les fichiers lus directement dans la mémoire partagée"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = [shm.buf[offset:offset + size] for offset, size, _ in layout]
+    try:
+        return _detector.classify_batch([(view, filename) for view, (_, _, filename) in zip(views, layout)])
+    finally:
+        for view in views:
+            view.release()
+        shm.close()
+
+def _ping():
+    """Tâche vide : force le démarrage d'un worker"""
+
+def _calibrate_batch_size() -> int:
+    return _detector.calibrate_batch_size()
+
+class InferencePool:
+    """Pool de processus qui exécutent l'inférence hors de la boucle asyncio du bot"""
+
+    def __init__(self, workers: int, start_method: str = INFERENCE_START_METHOD):
+        self.workers = workers
+        self.start_method = start_method
+        self.executor = None
+        self.pids = None  # PID de chaque worker, écrits par les workers eux-mêmes
+        self.stopping = None
+        self.start_lock = asyncio.Lock()
+        self.stats = {'starts': 0}
+
+    def _start(self) -> ProcessPoolExecutor:
+        """Crée le pool et démarre tous ses workers (bloquant : forkserver, préchargement des modèles)"""
+        if self.stopping is not None:
+            # Ne pas forker depuis un forkserver en cours d'arrêt
+            self.stopping.join()
+            self.stopping = None
+        # Jamais de fork du processus du bot lui-même (threads, boucle asyncio, état torch)
+        context = mp.get_context(self.start_method)
+        if self.start_method == 'forkserver':
+            context.set_forkserver_preload([MODEL_PRELOAD_MODULE])
+        pids = context.Array('i', self.workers)
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(context.Value('i', 0), pids)
+        )
+        # Chaque soumission démarre un worker tant qu'aucun n'est libre : tous sont lancés ici,
+        # et non par un submit() de la boucle asyncio
+        try:
+            for future in [executor.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+            # Un worker déjà prêt peut avoir traité plusieurs pings : attendre que tous se soient initialisés
+            deadline = time.monotonic() + WORKER_START_TIMEOUT
+            while not all(pids[:]) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        except Exception:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        self.stats['starts'] += 1
+        self.pids = pids
+        return executor
+
+    async def _get_executor(self) -> ProcessPoolExecutor:
+        """Pool prêt à l'emploi, démarré dans un thread pour ne jamais bloquer la boucle"""
+        if self.executor is None:
+            async with self.start_lock:
+                if self.executor is None:
+                    self.executor = await asyncio.to_thread(self._start)
+        return self.executor
+
+    async def classify_batch(self, items: List[Tuple[bytes, str]]) -> List[dict]:
+        """Copie le lot dans un segment de mémoire partagée et le classe dans un worker"""
+        total_size = sum(len(file_data) for file_data, _ in items)
+        shm = shared_memory.SharedMemory(create=True, size=max(total_size, 1))
+        try:
+            layout = []
+            offset = 0
+            for file_data, filename in items:
+                shm.buf[offset:offset + len(file_data)] = file_data
+                layout.append((offset, len(file_data), filename))
+                offset += len(file_data)
+
+            loop = asyncio.get_running_loop()
+            try:
+                executor = await self._get_executor()
+                return await loop.run_in_executor(executor, _classify_shared, shm.name, layout)
+            except BrokenProcessPool:
+                # Un worker est mort (OOM...) : repartir d'un pool neuf au prochain lot
+                self.shutdown(wait=False)
+                raise
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def calibrate_batch_size(self) -> int:
+        """Taille de lot calibrée dans un worker, avec ses modèles et ses threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(await self._get_executor(), _calibrate_batch_size)
+
+    def worker_pids(self) -> List[int]:
+        if self.executor is None or self.pids is None:
+            return []
+        return [pid for pid in self.pids[:] if pid]
+
+    def worker_rss(self) -> List[int]:
+        """Mémoire résidente (octets) de chaque worker en vie, pages partagées comprises"""
+        rss = []
+        for pid in self.worker_pids():
+            try:
+                rss.append(psutil.Process(pid).memory_info().rss)
+            except psutil.Error:
+                pass
+        return rss
+
+    def shutdown(self, wait: bool = True):
+        """Arrête les workers et le forkserver (voir INFERENCE_STOP_FORKSERVER), le prochain lot démarre un pool neuf"""
+        # Détacher d'abord : un lot soumis pendant l'arrêt part sur un nouvel executor
+        executor, self.executor = self.executor, None
+        if executor is None:
+            return
+        if wait:
+            self._stop(executor)
+        else:
+            self.stopping = threading.Thread(target=self._stop, args=(executor,), daemon=True)
+            self.stopping.start()
+
+    def _stop(self, executor: ProcessPoolExecutor):
+        executor.shutdown(wait=True, cancel_futures=True)
+        if self.start_method == 'forkserver' and INFERENCE_STOP_FORKSERVER:
+            # Le forkserver garde sa copie des modèles. Aucune API publique ne l'arrête : _stop() est interne
+            # à CPython (utilisé par ses tests) et arrête le forkserver de tout le processus, relancé avec
+            # un nouveau préchargement au prochain pool. S'il disparaît, seuls les workers sont arrêtés.
+            stop = getattr(getattr(multiprocessing.forkserver, '_forkserver', None), '_stop', None)
+            if stop is None:
+                print("Forkserver stop unavailable, its models stay loaded until exit")
+                return
+            stop()
@@ -0,0 +1,88 @@
+import io
+import tempfile
+from typing import List, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .dataloaders import exif_transpose
+
+def decode_image(file_data: bytes, target_size: int = 640) -> Optional[np.ndarray]:
+    """Décode une image en RGB (HWC) à une résolution proche de `target_size`, None si illisible"""
+    try:
+        with Image.open(io.BytesIO(file_data)) as image:
+            # JPEG : décodage DCT réduit (1/2, 1/4, 1/8) sans jamais matérialiser la pleine résolution
+            image.draft('RGB', (target_size, target_size))
+            return frame_to_rgb(image, target_size)
+    except Exception:
+        return None
+
+def decode_image_frames(file_data: bytes, max_frames: int = 4, target_size: int = 640) -> List[np.ndarray]:
+    """L'image elle-même, ou au plus `max_frames` images réparties sur une animation (GIF, WebP), en RGB (HWC)"""
+    frames = []
+    try:
+        with Image.open(io.BytesIO(file_data)) as image:
+            frame_count = getattr(image, 'n_frames', 1)
+            if frame_count <= 1:
+                image.draft('RGB', (target_size, target_size))
+                return [frame_to_rgb(image, target_size)]
+
+            # Positions régulièrement espacées (la première image, souvent vide ou un titre, n'est pas prise
+            # d'office) atteintes par seek croissant : seules ces images sont converties et redimensionnées
+            n = min(max_frames, frame_count)
+            for position in sorted({int((i + 0.5) * frame_count / n) for i in range(n)}):
+                image.seek(position)
+                frames.append(frame_to_rgb(image, target_size))
+    except Exception:
+        # Animation tronquée : garder les images déjà décodées
+        pass
+    return frames
+
+def frame_to_rgb(image: Image.Image, target_size: int) -> np.ndarray:
+    """Image (ou image courante d'une animation) orientée et réduite près de `target_size`, en RGB"""
+    image = exif_transpose(image)
+    if image.mode in ('P', '1'):
+        # Image.reduce ne gère pas les palettes (GIF)
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    # Autres formats : réduction entière rapide avant le redimensionnement du modèle
+    factor = min(image.size) // target_size
+    if factor >= 2:
+        image = image.reduce(factor)
+    return np.asarray(image.convert('RGB'))
+
+def decode_video_frames(file_data: bytes, max_frames: int = 4, target_size: int = 640, suffix: str = '.mp4') -> List[np.ndarray]:
+    """Décode au plus `max_frames` images clés réparties sur la vidéo, en RGB (HWC)"""
+    # OpenCV ne lit que depuis un fichier
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        tmp.write(file_data)
+        tmp.flush()
+        capture = cv2.VideoCapture(tmp.name)
+        try:
+            if not capture.isOpened():
+                return []
+
+            # Positions régulièrement espacées : seek puis une seule image décodée par position,
+            # le coût ne dépend donc pas de la durée de la vidéo
+            frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            if frame_count > 0:
+                n = min(max_frames, frame_count)
+                positions = [int((i + 0.5) * frame_count / n) for i in range(n)]
+            else:
+                positions = [None] * max_frames  # Durée inconnue : premières images du flux
+
+            frames = []
+            for position in positions:
+                if position is not None:
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, position)
+                ok, frame = capture.read()
+                if not ok:
+                    continue
+                scale = target_size / max(frame.shape[:2])
+                if scale < 1:
+                    frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            return frames
+        finally:
+            capture.release()
@@ -0,0 +1,85 @@
+"""
+Export TorchScript des modèles du détecteur (YOLOv5s et ResNet18)
+
+Usage:
+    python -m utils.model_export
+"""
+import copy
+import json
+from pathlib import Path
+from typing import Optional, Tuple
+
+import torch
+import torch.nn as nn
+
+COMPILED_MODELS_DIR = "model_cache/compiled"
+YOLO_ARTIFACT = "yolov5s.torchscript"
+RESNET_ARTIFACT = "resnet18.torchscript"
+
+def yolo_network(model: nn.Module) -> nn.Module:
+    """DetectionModel sous les enveloppes AutoShape / DetectMultiBackend de torch.hub"""
+    while hasattr(model, 'model') and not isinstance(model.model, nn.Sequential):
+        model = model.model
+    return model
+
+def save_artifact(module: torch.jit.ScriptModule, path: Path, metadata: dict):
+    """Enregistre un module TorchScript avec ses métadonnées (config.txt, comme export.py de YOLOv5)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    metadata = dict(metadata, torch=torch.__version__)
+    torch.jit.save(module, str(path), _extra_files={'config.txt': json.dumps(metadata)})
+
+def load_artifact(path: Path) -> Optional[Tuple[torch.jit.ScriptModule, dict]]:
+    """Charge un module TorchScript exporté, None s'il est absent ou produit par une autre version de torch"""
+    if not path.exists():
+        return None
+    extra_files = {'config.txt': ''}
+    module = torch.jit.load(str(path), map_location='cpu', _extra_files=extra_files)
+    metadata = json.loads(extra_files['config.txt'] or '{}')
+    if metadata.get('torch') != torch.__version__:
+        print(f"{path.name} was exported with torch {metadata.get('torch')}, re-run the export")
+        return None
+    return module.eval(), metadata
+
+def export_yolo(yolo_model: nn.Module, img_size: int, output_dir: Path) -> Path:
+    """Trace YOLOv5 comme export_torchscript() de export.py : tête Detect en mode export, sortie unique"""
+    model = copy.deepcopy(yolo_network(yolo_model)).float().eval()
+    for m in model.modules():
+        if type(m).__name__ in ('Detect', 'Segment'):
+            m.export = True
+    example = torch.zeros(1, 3, img_size, img_size)
+    with torch.no_grad():
+        for _ in range(2):
+            model(example)  # dry runs : les grilles de Detect sont construites au premier appel
+        module = torch.jit.trace(model, example, strict=False)
+    path = output_dir / YOLO_ARTIFACT
+    names = getattr(yolo_model, 'names', None) or getattr(model, 'names', {})
+    save_artifact(module, path, {
+        'shape': list(example.shape),
+        'stride': int(max(model.stride)),
+        'names': dict(names) if isinstance(names, dict) else dict(enumerate(names)),
+    })
+    return path
+
+def export_resnet(resnet_model: nn.Module, img_size: int, output_dir: Path) -> Path:
+    """Trace ResNet18 en channels_last, le format d'entrée utilisé par le détecteur"""
+    model = copy.deepcopy(resnet_model).eval().to(memory_format=torch.channels_last)
+    example = torch.zeros(1, 3, img_size, img_size).contiguous(memory_format=torch.channels_last)
+    with torch.no_grad():
+        module = torch.jit.trace(model, example)
+    path = output_dir / RESNET_ARTIFACT
+    save_artifact(module, path, {'shape': list(example.shape)})
+    return path
+
+def main():
+    from .ai_detector import MediaDetector, RESNET_IMG_SIZE, YOLO_IMG_SIZE
+
+    detector = MediaDetector.__new__(MediaDetector)
+    detector.load_eager_models()
+    detector.prepare_models()
+
+    output_dir = Path(COMPILED_MODELS_DIR)
+    print(f"Exported {export_yolo(detector.yolo_model, YOLO_IMG_SIZE, output_dir)}")
+    print(f"Exported {export_resnet(detector.resnet_model, RESNET_IMG_SIZE, output_dir)}")
+
+if __name__ == '__main__':
+    main()
@@ -1,55 +1,111 @@
+"""
+Chargement hors ligne des modèles depuis les sources vendues dans model_cache
+
+Usage (une fois, sur une machine connectée) :
+    python -m utils.model_loader
+"""
 import os
-import torch
 import sys
-import importlib.util
+import traceback
+from contextlib import contextmanager
 from pathlib import Path
+from typing import List, Optional
+
+import torch
+import torch.nn as nn
+
+# Dépôts torch.hub vendus, chargés avec source='local' (aucun accès à GitHub)
+YOLO_REPO_DIR = "model_cache/ultralytics_yolov5_master"
+VISION_REPO_DIR = "model_cache/pytorch_vision_v0.10.0"
+
+# Poids locaux, téléchargés une seule fois par `python -m utils.model_loader`
+YOLO_WEIGHTS = "model_cache/yolov5s.pt"
+RESNET_WEIGHTS = "model_cache/resnet18.pth"
+WEIGHT_URLS = {
+    YOLO_WEIGHTS: "https://github.com/ultralytics/yolov5/releases/download/v7.0/yolov5s.pt",
+    RESNET_WEIGHTS: "https://download.pytorch.org/models/resnet18-f37072fd.pth",
+}
+
+# Paquets de premier niveau du dépôt YOLOv5 qui portent le même nom que ceux du bot
+SHADOWED_PACKAGES = ('utils', 'models')
+
+# Pendant le chargement : pas d'installation pip ni de vérification réseau par ultralytics,
+# et les checkpoints YOLOv5 (objets picklés, fichiers locaux de confiance) restent lisibles
+OFFLINE_ENV = {
+    'YOLO_OFFLINE': 'True',
+    'YOLO_AUTOINSTALL': 'False',
+    'YOLOv5_AUTOINSTALL': 'False',
+    'TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD': '1',
+}
+
+def missing_weights() -> List[str]:
+    """Fichiers de poids absents de model_cache (ils ne sont pas versionnés)"""
+    return [path for path in WEIGHT_URLS if not Path(path).exists()]
 
-MODELS_CACHE_DIR = "cache/models"
+def _is_shadowed(module_name: str) -> bool:
+    return module_name.split('.')[0] in SHADOWED_PACKAGES
 
-def load_yolo_model():
-    """Load YOLOv5 model with caching"""
-    cache_path = Path(MODELS_CACHE_DIR) / "yolov5.pt"
-    
-    # Create cache directory if it doesn't exist
-    os.makedirs(MODELS_CACHE_DIR, exist_ok=True)
-    
+@contextmanager
+def vendored_repo():
+    """Isole les imports du dépôt vendu : ses `utils`/`models` remplacent temporairement ceux du bot"""
+    saved_path = sys.path[:]
+    saved_modules = {name: sys.modules.pop(name) for name in list(sys.modules) if _is_shadowed(name)}
+    saved_env = {key: os.environ.get(key) for key in OFFLINE_ENV}
+    os.environ.update(OFFLINE_ENV)
     try:
-        # Temporarily modify sys.path to avoid conflicts
-        original_path = sys.path.copy()
-        original_modules = sys.modules.copy()
-        
-        # Remove current directory from path to avoid importing local utils
-        if '' in sys.path:
-            sys.path.remove('')
-        if '.' in sys.path:
-            sys.path.remove('.')
-        
-        # Add a path to the beginning to prioritize YOLOv5's utils
-        sys.path.insert(0, str(Path(torch.__file__).parent.parent))
-            
-        try:
-            # Force reload torch.hub to avoid caching issues
-            if 'torch.hub' in sys.modules:
-                del sys.modules['torch.hub']
-            
-            if cache_path.exists():
-                print("Loading YOLOv5 model from cache...")
-                model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True, force_reload=False, trust_repo=True)
+        yield
+    finally:
+        for name in [name for name in sys.modules if _is_shadowed(name)]:
+            del sys.modules[name]
+        sys.modules.update(saved_modules)
+        sys.path[:] = saved_path
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
             else:
-                print("Downloading YOLOv5 model...")
-                model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True, trust_repo=True)
-                # Save to cache
-                torch.save(model.state_dict(), cache_path)
-            return model
-        finally:
-            # Restore original path and modules
-            sys.path = original_path
-            # Only restore modules that were present before
-            for module_name in list(sys.modules.keys()):
-                if module_name not in original_modules:
-                    del sys.modules[module_name]
+                os.environ[key] = value
+
+def load_yolo_model() -> Optional[nn.Module]:
+    """YOLOv5s (AutoShape) construit depuis le dépôt vendu et les poids locaux, None si indisponible"""
+    weights = Path(YOLO_WEIGHTS)
+    if not weights.exists():
+        print(f"YOLOv5 weights not found at {weights}, run `python -m utils.model_loader` on a connected host")
+        return None
+    try:
+        print("Loading YOLOv5 from local sources...")
+        with vendored_repo():
+            return torch.hub.load(YOLO_REPO_DIR, 'custom', path=str(weights.resolve()), source='local', _verbose=False)
     except Exception as e:
         print(f"Error loading YOLOv5 model: {str(e)}")
-        import traceback
         traceback.print_exc()
-        return None 
\ No newline at end of file
+        return None
+
+def load_resnet_model() -> Optional[nn.Module]:
+    """ResNet18 construit depuis le hubconf vendu de torchvision et les poids locaux, None si indisponible"""
+    weights = Path(RESNET_WEIGHTS)
+    if not weights.exists():
+        print(f"ResNet weights not found at {weights}, run `python -m utils.model_loader` on a connected host")
+        return None
+    try:
+        print("Loading ResNet from local sources...")
+        # Le hubconf importe `torchvision` : forcer le paquet installé plutôt que les sources v0.10 du dépôt
+        import torchvision  # noqa: F401
+        model = torch.hub.load(VISION_REPO_DIR, 'resnet18', source='local', pretrained=False)
+        model.load_state_dict(torch.load(weights, map_location='cpu'))
+        return model
+    except Exception as e:
+        print(f"Error loading ResNet model: {str(e)}")
+        traceback.print_exc()
+        return None
+
+def download_weights():
+    """Télécharge les poids manquants dans model_cache (seule étape qui utilise le réseau)"""
+    for path, url in WEIGHT_URLS.items():
+        if Path(path).exists():
+            print(f"{path} already present")
+            continue
+        print(f"Downloading {url}...")
+        torch.hub.download_url_to_file(url, path)
+
+if __name__ == '__main__':
+    download_weights()
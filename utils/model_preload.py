@@ -0,0 +1,17 @@
+"""
+Importé une seule fois par le forkserver du pool d'inférence : les modèles y sont chargés (et préchauffés)
+avant le fork des workers, qui partagent ensuite leurs poids en copy-on-write
+"""
+import gc
+import traceback
+
+from .inference_pool import _init_worker
+
+try:
+    _init_worker()
+except Exception:
+    # Une exception ici arrêterait le forkserver : les workers se rabattent sur leur propre chargement
+    traceback.print_exc()
+
+# Le GC ne parcourt plus les objets déjà créés : leurs pages ne sont pas recopiées dans chaque worker
+gc.freeze()
@@ -0,0 +1,143 @@
+import io
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+PHASH_CACHE_PATH = os.getenv('PHASH_CACHE_PATH', "cache/phash.db")
+PHASH_LRU_SIZE = 4096
+# Republications quasi identiques : distance de Hamming max entre deux pHash.
+# Le pHash est indexé en PHASH_BANDS bandes de 16 bits : une distance < PHASH_BANDS garantit une bande identique.
+PHASH_BANDS = 4
+PHASH_MAX_DISTANCE = 3
+
+def perceptual_hash(file_data: bytes) -> Optional[str]:
+    """pHash 64 bits (DCT 8x8 d'une vignette 32x32 en niveaux de gris), None si illisible"""
+    try:
+        with Image.open(io.BytesIO(file_data)) as image:
+            if getattr(image, 'is_animated', False):
+                # Le pHash de la première image ne représente pas une animation
+                return None
+            # JPEG : décodage réduit, la vignette ne demande presque aucun pixel
+            image.draft('L', (64, 64))
+            thumbnail = image.convert('L').resize((32, 32), Image.BILINEAR, reducing_gap=2.0)
+    except Exception:
+        return None
+    dct = cv2.dct(np.asarray(thumbnail, dtype=np.float32))[:8, :8]
+    bits = (dct > np.median(dct[1:, 1:])).flatten()
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):016x}"
+
+def phash_bands(phash: str) -> List[int]:
+    """Les PHASH_BANDS tranches de 16 bits du pHash, indexées en base"""
+    value = int(phash, 16)
+    return [(value >> (16 * i)) & 0xFFFF for i in range(PHASH_BANDS)]
+
+class PhashCache:
+    """Cache des classifications par pHash : LRU en mémoire devant une base SQLite, pour une version des modèles.
+
+    Une republication légèrement modifiée (recompression, redimensionnement) retrouve le classement
+    d'un pHash à au plus PHASH_MAX_DISTANCE bits de distance.
+    """
+
+    def __init__(self, model_version: str, path: str = PHASH_CACHE_PATH, lru_size: int = PHASH_LRU_SIZE):
+        self.model_version = model_version
+        self.lru = OrderedDict()
+        self.lru_size = lru_size
+        self.lock = threading.Lock()
+        # stale : lignes ignorées car produites par une autre version des modèles
+        self.stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'near_hits': 0, 'misses': 0, 'stale': 0}
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS classifications ("
+            "phash TEXT PRIMARY KEY, category TEXT, subcategory TEXT, confidence REAL, model_version TEXT)"
+        )
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(classifications)")]
+        if 'model_version' not in columns:
+            # Base d'avant le suivi des versions : ses lignes (NULL) seront ignorées puis remplacées
+            self.db.execute("ALTER TABLE classifications ADD COLUMN model_version TEXT")
+        if 'band0' not in columns:
+            for i in range(PHASH_BANDS):
+                self.db.execute(f"ALTER TABLE classifications ADD COLUMN band{i} INTEGER")
+            rows = self.db.execute("SELECT phash FROM classifications").fetchall()
+            self.db.executemany(
+                f"UPDATE classifications SET {', '.join(f'band{i} = ?' for i in range(PHASH_BANDS))} WHERE phash = ?",
+                [(*phash_bands(phash), phash) for phash, in rows]
+            )
+        for i in range(PHASH_BANDS):
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS classifications_band{i} ON classifications (band{i})")
+        self.db.commit()
+
+    def lookup_batch(self, file_data_list: List[Optional[bytes]]) -> Tuple[List[Optional[str]], List[Optional[Dict]]]:
+        """Calcule les pHash (None = pas d'image) et retourne les classifications déjà connues"""
+        hashes = [perceptual_hash(file_data) if file_data is not None else None for file_data in file_data_list]
+        return hashes, [self.get(phash) if phash else None for phash in hashes]
+
+    def get(self, phash: str) -> Optional[Dict]:
+        with self.lock:
+            if phash in self.lru:
+                self.lru.move_to_end(phash)
+                self.stats['hits'] += 1
+                self.stats['memory_hits'] += 1
+                return dict(self.lru[phash])
+
+            # Toute ligne à au plus PHASH_MAX_DISTANCE bits partage au moins une bande avec ce pHash
+            value = int(phash, 16)
+            rows = self.db.execute(
+                "SELECT phash, category, subcategory, confidence, model_version FROM classifications WHERE "
+                + " OR ".join(f"band{i} = ?" for i in range(PHASH_BANDS)),
+                phash_bands(phash)
+            ).fetchall()
+            best, best_distance = None, PHASH_MAX_DISTANCE + 1
+            for row in rows:
+                if row[4] != self.model_version:
+                    if row[0] == phash:
+                        self.stats['stale'] += 1
+                    continue
+                distance = (int(row[0], 16) ^ value).bit_count()
+                if distance < best_distance:
+                    best, best_distance = row, distance
+            if best is None:
+                self.stats['misses'] += 1
+                return None
+            if best_distance:
+                self.stats['near_hits'] += 1
+            self.stats['hits'] += 1
+            self.stats['disk_hits'] += 1
+            _, category, subcategory, confidence, _ = best
+            detection = {"confidence": confidence, "category": category, "subcategory": subcategory, "source": "model"}
+            self._remember(phash, detection)
+            return dict(detection)
+
+    def store_batch(self, entries: List[Tuple[str, Dict]]):
+        """Enregistre des classifications en une seule transaction"""
+        if not entries:
+            return
+        with self.lock:
+            for phash, detection in entries:
+                self._remember(phash, detection)
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO classifications (phash, category, subcategory, confidence, model_version, "
+                    f"{', '.join(f'band{i}' for i in range(PHASH_BANDS))}) VALUES ({', '.join('?' * (5 + PHASH_BANDS))})",
+                    [(phash, d['category'], d['subcategory'], d['confidence'], self.model_version, *phash_bands(phash))
+                     for phash, d in entries]
+                )
+
+    def _remember(self, phash: str, detection: Dict):
+        self.lru[phash] = dict(detection)
+        self.lru.move_to_end(phash)
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
@@ -0,0 +1,20 @@
+"""
+Quantification int8 des modèles pour l'inférence CPU
+"""
+import copy
+from typing import List
+
+import torch
+import torch.nn as nn
+
+def quantize_static(model: nn.Module, calibration_batches: List[torch.Tensor]) -> nn.Module:
+    """Quantification statique (FX) : convolutions int8, plages d'activation calibrées sur des images réelles"""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    prepared = prepare_fx(copy.deepcopy(model).eval(), qconfig_mapping, (calibration_batches[0],))
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+    return convert_fx(prepared)
@@ -0,0 +1,51 @@
+"""
+Threads torch et affinité CPU de l'inférence, selon le nombre de cœurs et de workers
+"""
+import os
+from typing import Dict, List, Optional
+
+import torch
+
+# 0 = automatique : les cœurs utilisables répartis entre les workers
+DETECTOR_THREADS = int(os.getenv('DETECTOR_THREADS', 0))
+DETECTOR_INTEROP_THREADS = int(os.getenv('DETECTOR_INTEROP_THREADS', 1))
+# Cœurs laissés à la boucle asyncio du bot et aux téléchargements
+DETECTOR_RESERVED_CORES = int(os.getenv('DETECTOR_RESERVED_CORES', 1))
+# Épingler chaque worker sur ses propres cœurs (Linux)
+DETECTOR_CPU_AFFINITY = os.getenv('DETECTOR_CPU_AFFINITY', '').lower() in ('1', 'true', 'yes')
+
+def available_cores() -> List[int]:
+    """Cœurs sur lesquels le processus peut tourner (quota de conteneur/taskset compris)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def runtime_profile(workers: int, worker_index: Optional[int] = None) -> Dict:
+    """Threads intra/inter-op et cœurs (ou None) d'un processus d'inférence parmi `workers`"""
+    cores = available_cores()
+    reserved = min(DETECTOR_RESERVED_CORES, len(cores) - 1)
+    usable = cores[reserved:]
+    per_worker = max(1, len(usable) // max(1, workers))
+
+    affinity = None
+    if DETECTOR_CPU_AFFINITY and worker_index is not None and hasattr(os, 'sched_setaffinity'):
+        # Plus de workers que de cœurs : les tranches se recouvrent
+        start = worker_index * per_worker
+        affinity = [usable[(start + i) % len(usable)] for i in range(per_worker)]
+
+    return {
+        'intra_op_threads': DETECTOR_THREADS or per_worker,
+        'inter_op_threads': DETECTOR_INTEROP_THREADS,
+        'affinity': affinity,
+    }
+
+def apply_runtime_profile(profile: Dict):
+    """À appeler avant le chargement des modèles (les threads inter-op ne sont réglables qu'une fois)"""
+    torch.set_num_threads(profile['intra_op_threads'])
+    try:
+        torch.set_num_interop_threads(profile['inter_op_threads'])
+    except RuntimeError:
+        # Déjà fixé dans ce processus (ou hérité du forkserver)
+        pass
+    if profile['affinity']:
+        os.sched_setaffinity(0, profile['affinity'])
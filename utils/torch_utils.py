@@ -95,6 +95,7 @@ def smart_inference_mode(torch_1_9=True):
 
     return decorate if torch_1_9 else lambda x: x
 
+@torch.no_grad()
 def fuse_conv_and_bn(conv, bn):
     """
     Fuse Conv2d and BatchNorm2d layers.
@@ -106,12 +107,13 @@ def fuse_conv_and_bn(conv, bn):
         kernel_size=conv.kernel_size,
         stride=conv.stride,
         padding=conv.padding,
+        dilation=conv.dilation,
         groups=conv.groups,
         bias=True
     ).requires_grad_(False).to(conv.weight.device)
 
     # Prepare filters
-    w_conv = conv.weight.clone().view(conv.out_channels, -1)
+    w_conv = conv.weight.clone().reshape(conv.out_channels, -1)
     w_bn = torch.diag(bn.weight.div(torch.sqrt(bn.eps + bn.running_var)))
     fusedconv.weight.copy_(torch.mm(w_bn, w_conv).view(fusedconv.weight.shape))
 
@@ -122,6 +124,30 @@ def fuse_conv_and_bn(conv, bn):
 
     return fusedconv
 
+def fuse_conv_bn_fx(model):
+    """
+    Fuse every BatchNorm2d into the Conv2d that feeds it, for models traceable with torch.fx (eval mode only).
+    Returns a GraphModule where each fused pair is a single Conv2d built by fuse_conv_and_bn.
+    """
+    traced = torch.fx.symbolic_trace(model.eval())
+    modules = dict(traced.named_modules())
+    for node in list(traced.graph.nodes):
+        if node.op != 'call_module' or not isinstance(modules[node.target], nn.BatchNorm2d):
+            continue
+        conv_node = node.args[0]
+        # The convolution output must feed this BatchNorm only, otherwise other users would see fused values
+        if not (isinstance(conv_node, torch.fx.Node) and conv_node.op == 'call_module'
+                and isinstance(modules[conv_node.target], nn.Conv2d) and len(conv_node.users) == 1):
+            continue
+        parent, _, name = conv_node.target.rpartition('.')
+        setattr(traced.get_submodule(parent), name, fuse_conv_and_bn(modules[conv_node.target], modules[node.target]))
+        node.replace_all_uses_with(conv_node)
+        traced.graph.erase_node(node)
+    traced.graph.lint()
+    traced.delete_all_unused_submodules()
+    traced.recompile()
+    return traced
+
 def profile(input, ops, n=10, device=None):
     """
     YOLOv5 speed/memory/FLOPs profiler
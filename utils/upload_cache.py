@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+UPLOAD_CACHE_PATH = "cache/uploads.json"
+UPLOAD_CACHE_TTL = 30 * 60  # 30 minutes
+
+class UploadCache:
+    """Associe l'empreinte du contenu d'une archive au lien déjà uploadé"""
+
+    def __init__(self, path: str = UPLOAD_CACHE_PATH, ttl: float = UPLOAD_CACHE_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.entries = self._load()
+
+    @staticmethod
+    def make_key(attachment_ids: Iterable[int], media_type: str) -> str:
+        """Empreinte stable des IDs d'attachments (triés) et du type demandé"""
+        digest = hashlib.sha256(media_type.encode())
+        for attachment_id in sorted(int(i) for i in attachment_ids):
+            digest.update(b"\0" + str(attachment_id).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Retourne l'entrée {url, stats, created_at} si elle n'a pas expiré"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry['created_at'] > self.ttl:
+            del self.entries[key]
+            self._save()
+            return None
+        return entry
+
+    def set(self, key: str, url: str, stats: Optional[Dict] = None):
+        """Enregistre le lien d'une archive et purge les entrées expirées"""
+        now = time.time()
+        self.entries = {k: v for k, v in self.entries.items() if now - v['created_at'] <= self.ttl}
+        self.entries[key] = {'url': url, 'stats': stats, 'created_at': now}
+        self._save()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Écriture atomique pour ne jamais laisser un fichier tronqué
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving upload cache: {e}")
+
+_upload_cache = None
+
+def get_upload_cache() -> UploadCache:
+    """Instance partagée par tous les uploaders du processus"""
+    global _upload_cache
+    if _upload_cache is None:
+        _upload_cache = UploadCache()
+    return _upload_cache
@@ -0,0 +1,279 @@
+import aiohttp
+import asyncio
+import io
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import BinaryIO, Dict, List, Optional, Union
+
+# Timeouts explicites : échouer vite si l'hébergeur ne répond pas
+UPLOAD_CONNECT_TIMEOUT = 10  # secondes
+UPLOAD_READ_TIMEOUT = 120  # secondes sans recevoir de données
+
+# Disjoncteur par hébergeur
+BREAKER_FAILURE_THRESHOLD = 3  # Échecs consécutifs avant ouverture
+BREAKER_RESET_TIMEOUT = 60  # Secondes avant un nouvel essai (half-open)
+
+# Taux de succès glissant
+HEALTH_WINDOW = 20  # Nombre de derniers uploads pris en compte
+HEALTH_MAX_AGE = 10 * 60  # Secondes avant qu'un résultat ne compte plus
+HEALTH_MIN_SUCCESS_RATE = 0.5  # En dessous, l'hébergeur passe après ceux en bonne santé
+HEALTH_MIN_SAMPLES = 5  # Résultats récents nécessaires avant de juger (les échecs isolés relèvent du disjoncteur)
+
+CATBOX_UPLOAD_URL = "https://catbox.moe/user/api.php"
+LITTERBOX_UPLOAD_URL = "https://litterbox.catbox.moe/resources/internals/api.php"
+GOFILE_UPLOAD_URL = "https://upload.gofile.io/uploadfile"
+
+class UploadError(Exception):
+    """Réponse invalide d'un hébergeur"""
+
+class UploadUnavailable(Exception):
+    """Aucun hébergeur disponible pour l'upload"""
+
+class CircuitBreaker:
+    """Disjoncteur classique closed -> open -> half-open"""
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allows_request(self) -> bool:
+        """Réserve une requête : toujours en closed, une seule requête d'essai à la fois en half-open"""
+        state = self.state
+        if state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return state == self.CLOSED
+
+    def release_probe(self):
+        """Requête d'essai abandonnée sans résultat (annulation)"""
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        # Un échec en half-open rouvre immédiatement le disjoncteur
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class HealthScore:
+    """Taux de succès sur les derniers uploads récents.
+
+    La latence n'en fait pas partie : elle dépend surtout de la taille de l'archive, pas de l'hébergeur.
+    """
+
+    def __init__(self, window: int = HEALTH_WINDOW, max_age: float = HEALTH_MAX_AGE,
+                 min_success_rate: float = HEALTH_MIN_SUCCESS_RATE):
+        self.samples = deque(maxlen=window)
+        self.max_age = max_age
+        self.min_success_rate = min_success_rate
+
+    def record(self, success: bool):
+        self.samples.append((time.monotonic(), success))
+
+    def recent(self) -> List[bool]:
+        # Les vieux résultats expirent pour qu'un hébergeur rétabli retrouve sa place
+        now = time.monotonic()
+        return [ok for at, ok in self.samples if now - at <= self.max_age]
+
+    @property
+    def success_rate(self) -> float:
+        recent = self.recent()
+        if not recent:
+            return 1.0
+        return sum(1 for ok in recent if ok) / len(recent)
+
+    @property
+    def healthy(self) -> bool:
+        return len(self.recent()) < HEALTH_MIN_SAMPLES or self.success_rate >= self.min_success_rate
+
+class UploadBackend(ABC):
+    """Hébergeur externe avec son disjoncteur et son taux de succès récent"""
+    name = 'backend'
+
+    def __init__(self, url: str):
+        self.url = url
+        self.breaker = CircuitBreaker()
+        self.health = HealthScore()
+
+    @abstractmethod
+    def build_request(self, file_data: Union[bytes, BinaryIO], filename: str) -> Dict:
+        """Arguments de session.post() pour envoyer le fichier"""
+
+    async def parse_response(self, response: aiohttp.ClientResponse) -> str:
+        text = await response.text()
+        if response.status != 200 or not text.startswith('http'):
+            raise UploadError(f"{self.name} upload failed ({response.status}): {text[:200]}")
+        return text.strip()
+
+    async def upload(self, session: aiohttp.ClientSession, file_data: Union[bytes, BinaryIO], filename: str) -> str:
+        async with session.post(self.url, **self.build_request(file_data, filename)) as response:
+            return await self.parse_response(response)
+
+class CatboxBackend(UploadBackend):
+    name = 'catbox'
+
+    def __init__(self, url: str = CATBOX_UPLOAD_URL):
+        super().__init__(url)
+
+    def build_request(self, file_data, filename):
+        data = aiohttp.FormData()
+        data.add_field('reqtype', 'fileupload')
+        data.add_field('userhash', '')
+        data.add_field('fileToUpload', file_data, filename=filename)
+        return {'data': data}
+
+class LitterboxBackend(UploadBackend):
+    """Hébergement temporaire de Catbox, sur une infrastructure séparée"""
+    name = 'litterbox'
+
+    def __init__(self, url: str = LITTERBOX_UPLOAD_URL, expiry: str = '72h'):
+        super().__init__(url)
+        self.expiry = expiry
+
+    def build_request(self, file_data, filename):
+        data = aiohttp.FormData()
+        data.add_field('reqtype', 'fileupload')
+        data.add_field('time', self.expiry)
+        data.add_field('fileToUpload', file_data, filename=filename)
+        return {'data': data}
+
+class GofileBackend(UploadBackend):
+    name = 'gofile'
+
+    def __init__(self, url: str = GOFILE_UPLOAD_URL, token: Optional[str] = None):
+        super().__init__(url)
+        self.token = token
+
+    def build_request(self, file_data, filename):
+        data = aiohttp.FormData()
+        data.add_field('file', file_data, filename=filename)
+        headers = {'Authorization': f"Bearer {self.token}"} if self.token else {}
+        return {'data': data, 'headers': headers}
+
+    async def parse_response(self, response):
+        try:
+            payload = await response.json(content_type=None)
+        except ValueError:
+            payload = {}
+        if response.status != 200 or payload.get('status') != 'ok':
+            raise UploadError(f"{self.name} upload failed ({response.status}): {payload}")
+        return payload['data']['downloadPage']
+
+class UploadRouter:
+    """Envoie vers le premier hébergeur disponible, dans l'ordre configuré, et bascule sur le suivant en cas d'échec"""
+
+    def __init__(self, backends: List[UploadBackend],
+                 connect_timeout: float = UPLOAD_CONNECT_TIMEOUT,
+                 read_timeout: float = UPLOAD_READ_TIMEOUT):
+        self.backends = backends
+        self.timeout = aiohttp.ClientTimeout(
+            total=None,
+            connect=connect_timeout,
+            sock_connect=connect_timeout,
+            sock_read=read_timeout
+        )
+
+    def candidates(self) -> List[UploadBackend]:
+        """Hébergeurs dont le disjoncteur n'est pas ouvert, dans l'ordre configuré (Catbox d'abord) ;
+        ceux dont le taux de succès récent est trop bas passent en dernier"""
+        available = [backend for backend in self.backends if backend.breaker.state != CircuitBreaker.OPEN]
+        # Tri stable : l'ordre de préférence est conservé parmi les hébergeurs sains
+        return sorted(available, key=lambda backend: not backend.health.healthy)
+
+    @staticmethod
+    def attempt_data(file_data: Union[bytes, BinaryIO], start_offset: Optional[int]) -> Union[bytes, BinaryIO]:
+        """Flux propre à une tentative : aiohttp ferme le fichier envoyé, même quand l'hébergeur échoue"""
+        if start_offset is None:
+            return file_data
+        if isinstance(file_data, io.BytesIO):
+            # Nouveau BytesIO sur le même tampon, sans copie
+            stream = io.BytesIO(file_data.getvalue())
+        else:
+            # Descripteur dupliqué : le fichier de l'appelant reste ouvert
+            stream = os.fdopen(os.dup(file_data.fileno()), 'rb')
+        stream.seek(start_offset)
+        return stream
+
+    async def upload(self, file_data: Union[bytes, BinaryIO], filename: str) -> str:
+        candidates = self.candidates()
+        if not candidates:
+            raise UploadUnavailable("All upload hosts are unavailable")
+
+        start_offset = file_data.tell() if hasattr(file_data, 'seek') else None
+        errors = []
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            for backend in candidates:
+                if not backend.breaker.allows_request():
+                    # Une requête d'essai half-open est déjà en cours
+                    continue
+                data = None
+                try:
+                    data = self.attempt_data(file_data, start_offset)
+                    url = await backend.upload(session, data, filename)
+                except asyncio.CancelledError:
+                    backend.breaker.release_probe()
+                    raise
+                except Exception as e:
+                    # Toute erreur (réseau, réponse, payload) compte comme un échec de cet hébergeur
+                    backend.breaker.record_failure()
+                    backend.health.record(False)
+                    print(f"Upload to {backend.name} failed: {e!r}")
+                    errors.append(f"{backend.name}: {e!r}")
+                    continue
+                finally:
+                    if data is not None and data is not file_data:
+                        data.close()
+                backend.breaker.record_success()
+                backend.health.record(True)
+                return url
+
+        if not errors:
+            raise UploadUnavailable("All upload hosts are unavailable")
+        raise UploadUnavailable(f"All upload hosts failed: {'; '.join(errors)}")
+
+    def status(self) -> List[Dict]:
+        """État des hébergeurs pour les métriques"""
+        return [
+            {
+                'name': backend.name,
+                'state': backend.breaker.state,
+                'failures': backend.breaker.failures,
+                'success_rate': round(backend.health.success_rate, 3),
+                'healthy': backend.health.healthy
+            }
+            for backend in self.backends
+        ]
+
+_upload_router = None
+
+def get_upload_router() -> UploadRouter:
+    """Routeur partagé : les disjoncteurs survivent d'un upload à l'autre"""
+    global _upload_router
+    if _upload_router is None:
+        _upload_router = UploadRouter([
+            CatboxBackend(),
+            LitterboxBackend(),
+            GofileBackend(token=os.getenv('GOFILE_TOKEN')),
+        ])
+    return _upload_router